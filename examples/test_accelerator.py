@@ -0,0 +1,414 @@
+from gevent import monkey
+
+monkey.patch_all()
+import json
+import os
+import tempfile
+import time
+import unittest
+
+import gevent
+from loguru import logger
+
+from services.utils import CoroutineSpeedup, JsonlSink, CsvSink, Checkpoint, canonicalize_url
+from services.utils.accelerator.controller import AIMDController
+from services.utils.accelerator.dedup import BloomFilter
+from services.utils.accelerator.metrics import LatencyHistogram
+from services.utils.accelerator.timeout import TimeoutPolicy
+
+
+class _Echo(CoroutineSpeedup):
+    def control_driver(self, task, *args, **kwargs):
+        gevent.sleep(0.001)
+        self.emit(task)
+
+
+class CoroutineSpeedupTest(unittest.TestCase):
+
+    def test_list_docker(self):
+        sug = _Echo(docker=list(range(50)))
+        sug.go(power=8)
+        self.assertEqual(sorted(sug.offload()), list(range(50)))
+        self.assertEqual(sug.progress(), "50/50")
+
+    def test_generator_docker_is_fed_lazily(self):
+        pulled = []
+
+        def _source():
+            for i in range(200):
+                pulled.append(i)
+                yield i
+
+        class _Probe(_Echo):
+            def control_driver(self, task, *args, **kwargs):
+                # 首个任务执行时，任务源不应被一次性读尽
+                if task == 0:
+                    self.first_seen = len(pulled)
+                super(_Probe, self).control_driver(task)
+
+        sug = _Probe(docker=_source(), queue_size=4)
+        sug.go(power=2)
+        self.assertLess(sug.first_seen, 200)
+        self.assertEqual(len(sug.offload()), 200)
+        self.assertEqual(sug.progress(), "200/?")
+
+    def test_empty_docker(self):
+        sug = _Echo(docker=iter([]))
+        sug.go(power=4)
+        self.assertEqual([], sug.offload())
+
+    def test_host_limit(self):
+        peak = {}
+        inflight = {}
+
+        class _Host(CoroutineSpeedup):
+            def control_driver(self, task, *args, **kwargs):
+                host = self.host_key(task)
+                inflight[host] = inflight.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), inflight[host])
+                gevent.sleep(0.005)
+                inflight[host] -= 1
+                self.done.put_nowait(task)
+
+        docker = [
+            f"https://host{i}.com{path}"
+            for i in range(10)
+            for path in ["/auth/register", "/tos", "/staff", ""]
+        ]
+        sug = _Host(docker=docker, host_limit=1)
+        sug.go(power=32)
+        self.assertEqual(len(sug.offload()), len(docker))
+        self.assertEqual(set(peak.values()), {1})
+
+    def test_adaptive_power(self):
+        sug = _Echo(docker=range(400), adaptive=True, max_power=64, interval=0.05)
+        sug.go(power=4)
+        self.assertEqual(len(sug.offload()), 400)
+        self.assertGreater(max(p for _, p in sug.power_history), 4)
+
+    def test_sink_streams_results(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            sink = JsonlSink(os.path.join(dir_, "stream.jsonl"), batch_size=16)
+            sug = _Echo(docker=range(100), sink=sink)
+            sug.go(power=8)
+            self.assertEqual([], sug.offload())
+            self.assertEqual(sorted(sink.load()), list(range(100)))
+
+    def test_callable_sink(self):
+        received = []
+        sug = _Echo(docker=range(10), sink=received.append)
+        sug.go(power=2)
+        self.assertEqual(sorted(received), list(range(10)))
+
+    def test_task_timeout(self):
+        class _Slow(CoroutineSpeedup):
+            def control_driver(self, task, *args, **kwargs):
+                gevent.sleep(10 if task % 10 == 0 else 0.001)
+                self.emit(task)
+
+            def on_deadline(self, task):
+                super(_Slow, self).on_deadline(task)
+                self.emit(-task)
+
+        sug = _Slow(docker=range(1, 51), task_timeout=0.05)
+        sug.go(power=8)
+        results = sug.offload()
+        self.assertEqual(sorted(r for r in results if r < 0), [-50, -40, -30, -20, -10])
+        self.assertEqual(len(results), 50)
+        self.assertLess(sug.latency.max, 1)
+
+    def test_run_budget(self):
+        class _Tarpit(CoroutineSpeedup):
+            def control_driver(self, task, *args, **kwargs):
+                gevent.sleep(0.01 if task < 20 else 10)
+                self.emit(task)
+
+            def on_deadline(self, task):
+                self.emit(("deadline", task))
+
+        sug = _Tarpit(docker=range(1000), budget=0.3)
+        start = time.time()
+        sug.go(power=4)
+        self.assertLess(time.time() - start, 2)
+        results = sug.offload()
+        self.assertEqual(sorted(r for r in results if isinstance(r, int)), list(range(20)))
+        self.assertEqual(len([r for r in results if isinstance(r, tuple)]), 4)
+        self.assertGreater(sug.skipped, 0)
+
+    def test_run_budget_adaptive(self):
+        class _Tarpit(CoroutineSpeedup):
+            def control_driver(self, task, *args, **kwargs):
+                gevent.sleep(10)
+
+        # 时限到期时协程全部忙于在途任务，功率调节协程同样须随之结束
+        sug = _Tarpit(docker=range(100), budget=0.3, adaptive=True, interval=0.1)
+        start = time.time()
+        sug.go(power=4)
+        self.assertLess(time.time() - start, 2)
+        self.assertTrue(sug._exhausted.is_set())
+
+    def test_retry_with_backoff(self):
+        calls = {}
+
+        class _Flaky(CoroutineSpeedup):
+            def control_driver(self, task, *args, **kwargs):
+                calls[task] = calls.get(task, 0) + 1
+                # 偶数任务第三次才成功，9 永远失败
+                if (task % 2 == 0 and calls[task] < 3) or task == 9:
+                    if self.retry(task):
+                        return
+                    self.emit(("failed", task, self.retries(task)))
+                    return
+                self.emit((task, self.retries(task)))
+
+        sug = _Flaky(docker=range(10), max_attempts=3, backoff=0.01)
+        sug.go(power=4)
+        results = sorted(sug.offload(), key=str)
+        self.assertIn(("failed", 9, 2), results)
+        self.assertIn((0, 2), results)
+        self.assertIn((1, 0), results)
+        self.assertEqual(len(results), 10)
+        self.assertEqual(calls[9], 3)
+        self.assertEqual(sug.progress(), "10/10")
+
+    def test_retry_unhashable_tasks(self):
+        class _Flaky(CoroutineSpeedup):
+            def control_driver(self, task, *args, **kwargs):
+                task["calls"] = task.get("calls", 0) + 1
+                if task["calls"] < 2 and self.retry(task):
+                    return
+                self.emit((task["id"], self.retries(task)))
+
+        sug = _Flaky(docker=({"id": i} for i in range(5)), max_attempts=3, backoff=0.01)
+        sug.go(power=2)
+        self.assertEqual(sorted(sug.offload()), [(i, 1) for i in range(5)])
+        self.assertEqual(sug.progress(), "5/?")
+
+    def test_unhashable_list_docker(self):
+        sug = _Echo(docker=[{"a": 1}, {"b": 2}])
+        sug.go(power=2)
+        self.assertEqual(sorted(sug.offload(), key=str), [{"a": 1}, {"b": 2}])
+        self.assertEqual(sug.max_queue_size, 2)
+
+    def test_priority(self):
+        order = []
+
+        class _Order(CoroutineSpeedup):
+            def control_driver(self, task, *args, **kwargs):
+                order.append(task)
+
+        sug = _Order(docker=iter(range(20)), priority=lambda x: (x % 2, -x))
+        sug.go(power=1)
+        self.assertEqual(order[:3], [18, 16, 14])
+        self.assertEqual(order[-1], 1)
+        self.assertEqual(sug.progress(), "20/20")
+
+    def test_metrics(self):
+        class _Mixed(CoroutineSpeedup):
+            def control_driver(self, task, *args, **kwargs):
+                gevent.sleep(0.001)
+                if task % 5 == 0:
+                    self.record_error(ConnectionError())
+                if task == 10:
+                    self.snapshot = self.stats()
+
+        with tempfile.TemporaryDirectory() as dir_:
+            path = os.path.join(dir_, "metrics.json")
+            sug = _Mixed(docker=range(50), metrics_path=path)
+            sug.go(power=4)
+            self.assertGreaterEqual(sug.snapshot["in_flight"], 1)
+            with open(path, "r", encoding="utf8") as f:
+                summary = json.load(f)
+        self.assertEqual(summary["completed"], 50)
+        self.assertEqual(summary["errors"], {"ConnectionError": 10})
+        self.assertEqual(summary["latency"]["count"], 50)
+        self.assertGreater(summary["tasks_per_second"], 0)
+
+    def test_checkpoint_resume(self):
+        executed = []
+
+        class _Crash(CoroutineSpeedup):
+            def control_driver(self, task, *args, **kwargs):
+                if task == 30 and self.crash:
+                    raise KeyboardInterrupt
+                executed.append(task)
+                self.emit({"task": task})
+
+        with tempfile.TemporaryDirectory() as dir_:
+            path = os.path.join(dir_, "checkpoint.jsonl")
+            sug = _Crash(docker=list(range(60)), checkpoint=Checkpoint(path, batch_size=1))
+            sug.crash = True
+            with self.assertRaises(KeyboardInterrupt):
+                sug.go(power=1)
+            self.assertEqual(executed, list(range(30)))
+
+            executed.clear()
+            sug = _Crash(docker=list(range(60)), checkpoint=Checkpoint(path))
+            sug.crash = False
+            sug.go(power=4)
+            self.assertEqual(sorted(executed), list(range(30, 60)))
+            self.assertEqual(sorted(r["task"] for r in sug.offload()), list(range(60)))
+            self.assertEqual(sug.progress(), "30/30")
+
+    def test_canonical_dedupe(self):
+        docker = [
+            "https://a.com/auth/register",
+            "https://A.com/auth/register/",
+            "https://a.com:443/auth/register",
+            "https://a.com › auth › register",
+            "https://b.com/auth/register",
+        ]
+        for kwargs in [{}, {"dedupe_capacity": 1000}, {"workers": 2}]:
+            sug = _Echo(docker=docker, canonicalize=canonicalize_url, dedupe=True, **kwargs)
+            sug.go(power=4)
+            self.assertEqual(
+                sorted(sug.offload()), ["https://a.com/auth/register", "https://b.com/auth/register"]
+            )
+
+    def test_sharded_workers(self):
+        class _Pid(CoroutineSpeedup):
+            def control_driver(self, task, *args, **kwargs):
+                self.emit({"task": task, "host": self.host_key(task), "pid": os.getpid()})
+
+        docker = [f"https://host{i % 20}.com/{i}" for i in range(200)]
+        sug = _Pid(docker=docker, workers=3)
+        sug.go(power=12)
+        results = sug.offload()
+        self.assertEqual(sorted(r["task"] for r in results), sorted(docker))
+        self.assertEqual(len({r["pid"] for r in results}), 3)
+        self.assertNotIn(os.getpid(), {r["pid"] for r in results})
+        # 同一主机只会落在一个工作进程
+        owners = {}
+        for r in results:
+            owners.setdefault(r["host"], set()).add(r["pid"])
+        self.assertTrue(all(len(pids) == 1 for pids in owners.values()))
+        self.assertEqual(sug.metrics.completed, 200)
+
+    def test_sharded_metrics_reported_once(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            path_log = os.path.join(dir_, "runtime.log")
+            handler = logger.add(path_log, format="{message}", level="INFO")
+            path_metrics = os.path.join(dir_, "metrics.json")
+            try:
+                sug = _Echo(docker=list(range(60)), workers=3, metrics_path=path_metrics)
+                sug.go(power=9)
+            finally:
+                logger.remove(handler)
+            with open(path_log, "r", encoding="utf8") as f:
+                lines = [line for line in f if line.startswith("运行指标")]
+            self.assertEqual(len(lines), 1)
+            self.assertEqual(json.loads(lines[0].split(" - ", 1)[1])["completed"], 60)
+            # 功率与进度由各分片汇总
+            with open(path_metrics, "r", encoding="utf8") as f:
+                summary = json.load(f)
+            self.assertEqual((summary["power"], summary["progress"]), (9, "60/60"))
+
+
+class ResultSinkTest(unittest.TestCase):
+
+    def test_batched_flush(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            sink = JsonlSink(os.path.join(dir_, "stream.jsonl"), batch_size=3)
+            for i in range(4):
+                sink.write({"url": f"https://{i}.com", "label": "Normal"})
+            # 仅首批落盘
+            self.assertEqual(len(list(sink.load())), 3)
+            sink.close()
+            self.assertEqual(len(list(sink.load())), 4)
+
+    def test_csv_sink_appends_header_once(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            path = os.path.join(dir_, "stream.csv")
+            for _ in range(2):
+                sink = CsvSink(path, fieldnames=["url", "label"])
+                sink.write({"url": "https://a.com", "label": "Normal"})
+                sink.close()
+            self.assertEqual(list(sink.load()), [{"url": "https://a.com", "label": "Normal"}] * 2)
+
+
+class DedupTest(unittest.TestCase):
+
+    def test_canonicalize_url(self):
+        self.assertEqual(canonicalize_url("http://A.com:80/"), "http://a.com")
+        self.assertEqual(canonicalize_url("https://a.com:8443/tos/"), "https://a.com:8443/tos")
+        self.assertEqual(canonicalize_url("https://a.com › … › register"), "https://a.com/register")
+        self.assertEqual(canonicalize_url("a.com/auth/register"), "https://a.com/auth/register")
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(capacity=10000, error_rate=0.001)
+        for i in range(10000):
+            bloom.add(f"https://{i}.com")
+        self.assertTrue(all(f"https://{i}.com" in bloom for i in range(10000)))
+        false_positives = sum(f"https://x{i}.com" in bloom for i in range(10000))
+        self.assertLess(false_positives, 50)
+
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def test_percentiles(self):
+        hist = LatencyHistogram()
+        for i in range(1, 1001):
+            hist.observe(i / 1000)
+        self.assertAlmostEqual(hist.percentile(50), 0.5, delta=0.05)
+        self.assertAlmostEqual(hist.percentile(99), 0.99, delta=0.1)
+        self.assertEqual(hist.percentile(100), 1.0)
+        self.assertEqual(hist.summary()["count"], 1000)
+
+
+class AIMDControllerTest(unittest.TestCase):
+
+    def test_additive_increase(self):
+        ctl = AIMDController(power=10, step=4)
+        for _ in range(100):
+            ctl.observe(ok=True)
+        self.assertEqual(ctl.update(1.0), 14)
+
+    def test_multiplicative_decrease(self):
+        ctl = AIMDController(power=100, backoff=0.5)
+        for i in range(100):
+            ctl.observe(ok=i % 2 == 0)
+        self.assertEqual(ctl.update(1.0), 50)
+
+    def test_bounds(self):
+        ctl = AIMDController(power=3, min_power=2, max_power=5, step=10)
+        ctl.observe(ok=True)
+        self.assertEqual(ctl.update(1.0), 5)
+        for _ in range(10):
+            ctl.observe(ok=False)
+        self.assertEqual(ctl.update(1.0), 3)
+        for _ in range(10):
+            ctl.observe(ok=False)
+        self.assertEqual(ctl.update(1.0), 2)
+
+
+class TimeoutPolicyTest(unittest.TestCase):
+
+    def test_fixed(self):
+        policy = TimeoutPolicy(connect=5, read=30)
+        for _ in range(100):
+            policy.observe(0.1)
+        self.assertEqual(policy.timeout, (5, 30))
+
+    def test_adaptive(self):
+        policy = TimeoutPolicy(connect=10, read=60, adaptive=True, min_samples=50, refresh=10)
+        for _ in range(49):
+            policy.observe(2)
+        # 样本不足时沿用配置值
+        self.assertEqual(policy.timeout, (10, 60))
+        # p99 * 3 = 6：连接超时收紧至 6 秒，读取超时受下限 10 秒约束
+        policy.observe(2)
+        self.assertEqual(policy.timeout, (6, 10))
+
+        # 延迟极低时受下限约束，极高时受配置值约束
+        fast = TimeoutPolicy(adaptive=True, min_samples=10, refresh=10)
+        for _ in range(10):
+            fast.observe(0.01)
+        self.assertEqual(fast.timeout, (3, 10))
+        slow = TimeoutPolicy(adaptive=True, min_samples=10, refresh=10)
+        for _ in range(10):
+            slow.observe(100)
+        self.assertEqual(slow.timeout, (10, 60))
+
+
+if __name__ == "__main__":
+    unittest.main()
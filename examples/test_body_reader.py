@@ -0,0 +1,68 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from services.utils import read_body
+
+HEAD = b"<html><body><form><input id='passwd'></form><div class='simple-footer'>x</div>"
+PAGE = HEAD + b"<script>grecaptcha.getResponse()</script>" + b"A" * 512 * 1024 + b"</body></html>"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        try:
+            self.wfile.write(PAGE)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class ReadBodyTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def _get(self):
+        return requests.get(self.url, stream=True, timeout=5)
+
+    def test_full(self):
+        response = self._get()
+        n_bytes, aborted = read_body(response)
+        self.assertFalse(aborted)
+        self.assertEqual(response.content, PAGE)
+        self.assertEqual(n_bytes, len(PAGE))
+
+    def test_cap(self):
+        response = self._get()
+        n_bytes, aborted = read_body(response, max_bytes=1000, chunk_size=256)
+        self.assertTrue(aborted)
+        self.assertEqual(response.content, PAGE[:1000])
+        self.assertLess(n_bytes, len(PAGE))
+
+    def test_markers(self):
+        response = self._get()
+        n_bytes, aborted = read_body(response, markers=("</FORM>", "simple-footer"), grace=64, chunk_size=16)
+        self.assertTrue(aborted)
+        self.assertLess(len(response.content), len(HEAD) + 64 + 16)
+        self.assertIn("grecaptcha.get", response.text)
+        self.assertLess(n_bytes, 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
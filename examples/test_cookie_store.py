@@ -0,0 +1,47 @@
+from gevent import monkey
+
+monkey.patch_all()
+import os
+import tempfile
+import time
+import unittest
+
+import requests
+
+from services.utils import ClearanceCookieStore
+
+
+class ClearanceCookieStoreTest(unittest.TestCase):
+
+    def test_roundtrip(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            path = os.path.join(dir_, "cf_clearance.json")
+
+            session = requests.Session()
+            session.cookies.set("cf_clearance", "token", domain=".a.com", path="/", expires=int(time.time()) + 600)
+            session.cookies.set("session_id", "private", domain="a.com", path="/")
+            session.cookies.set("cf_clearance", "other", domain="b.com", path="/", expires=int(time.time()) + 600)
+            store = ClearanceCookieStore(path)
+            store.harvest(session, "a.com", "UA/1.0")
+            store.save()
+
+            # 新的运行读回凭证
+            store = ClearanceCookieStore(path)
+            self.assertEqual(len(store), 1)
+            fresh = requests.Session()
+            self.assertEqual(store.apply(fresh, "a.com"), "UA/1.0")
+            self.assertEqual(fresh.cookies.get("cf_clearance", domain=".a.com"), "token")
+            self.assertIsNone(fresh.cookies.get("session_id"))
+            self.assertIsNone(store.apply(requests.Session(), "b.com"))
+
+    def test_expired(self):
+        session = requests.Session()
+        session.cookies.set("cf_clearance", "token", domain="a.com", path="/", expires=int(time.time()) + 1)
+        store = ClearanceCookieStore()
+        store.harvest(session, "a.com", "UA/1.0")
+        store._entries["a.com"]["cookies"][0]["expires"] = time.time() - 1
+        self.assertIsNone(store.apply(requests.Session(), "a.com"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.utils import DatasetMirror
+
+DATASETS = {
+    "/dataset_2022-02-06.txt": b"https://a.com\nhttps://b.com\n\n",
+    "/dataset_2022-02-07.txt": b"https://b.com\r\nhttps://c.com",
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        etag = f'"{hash(self.path)}"'
+        self.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path not in DATASETS:
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = DATASETS[self.path]
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DatasetMirrorTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.template = f"http://127.0.0.1:{self.server.server_port}/{{}}"
+        self.names = ["dataset_2022-02-05.txt", "dataset_2022-02-06.txt", "dataset_2022-02-07.txt"]
+        _Handler.requests.clear()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.dir.cleanup()
+
+    def test_mirror(self):
+        mirror = DatasetMirror(self.dir.name, self.template, timeout=2)
+        paths = mirror.fetch_all(self.names)
+        self.assertEqual([os.path.basename(p) for p in paths], self.names[1:])
+        self.assertEqual(mirror.downloaded, 2)
+        self.assertEqual(sorted(set(DatasetMirror.iter_lines(paths))),
+                         ["https://a.com", "https://b.com", "https://c.com"])
+
+        # 再次运行：已下载的数据集以条件请求复检
+        _Handler.requests.clear()
+        mirror = DatasetMirror(self.dir.name, self.template, timeout=2)
+        self.assertEqual(mirror.fetch_all(self.names), paths)
+        self.assertEqual((mirror.downloaded, mirror.revalidated), (0, 2))
+        self.assertTrue(all(etag for path, etag in _Handler.requests if path in DATASETS))
+
+    def test_offline(self):
+        DatasetMirror(self.dir.name, self.template, timeout=2).fetch_all(self.names)
+        self.server.shutdown()
+        self.server.server_close()
+        # 远程不可达时回落至本地副本
+        mirror = DatasetMirror(self.dir.name, self.template, timeout=2)
+        self.assertEqual(len(mirror.fetch_all(self.names)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
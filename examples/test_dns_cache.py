@@ -0,0 +1,92 @@
+from gevent import monkey
+
+monkey.patch_all()
+import os
+import socket
+import tempfile
+import unittest
+
+from services.sspanel_mining import SSPanelHostsClassifier
+from services.utils import DnsCache
+
+
+class DnsCacheTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "nxdomain.json")
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_negative_cache(self):
+        resolver = DnsCache(self.path)
+        self.assertEqual(resolver.resolve_all(["localhost", "sspanel-mining.invalid"]), {"sspanel-mining.invalid"})
+        resolver.save()
+
+        # 负缓存跨运行生效，不再发起解析
+        resolver = DnsCache(self.path)
+        resolver.resolve = None
+        self.assertTrue(resolver.is_negative("sspanel-mining.invalid"))
+        self.assertEqual(resolver.resolve_all(["sspanel-mining.invalid"]), {"sspanel-mining.invalid"})
+
+    def test_getaddrinfo(self):
+        resolver = DnsCache()
+        self.assertTrue(resolver.resolve("localhost"))
+        resolver._positive["cached.invalid"] = resolver._positive["localhost"]
+        resolver.install()
+        try:
+            addresses = socket.getaddrinfo("cached.invalid", 8080, 0, socket.SOCK_STREAM)
+            self.assertTrue(addresses)
+            self.assertTrue(all(a[4][1] == 8080 for a in addresses))
+        finally:
+            resolver.uninstall()
+        self.assertNotEqual(socket.getaddrinfo, resolver.getaddrinfo)
+
+    def test_preresolve(self):
+        docker = [
+            "https://localhost/auth/register",
+            "https://sspanel-mining.invalid/auth/register",
+            "https://SSPanel-Mining.invalid/auth/register/",
+            "http://sspanel-mining.invalid/auth/register",
+        ]
+        sug = SSPanelHostsClassifier(docker=[], resolver=DnsCache())
+        sug.local_proxy = {}
+        pending = sug.preresolve(docker)
+        self.assertEqual(pending, ["https://localhost/auth/register", "http://sspanel-mining.invalid/auth/register"])
+        self.assertEqual([r.to_dict() for r in sug.offload()], [{
+            "url": "https://sspanel-mining.invalid/auth/register", "label": "域名失效", "retries": 0
+        }])
+
+        # 经本机代理出站时跳过预解析
+        sug = SSPanelHostsClassifier(docker=[], resolver=DnsCache())
+        sug.local_proxy = {"https": "http://127.0.0.1:7890"}
+        self.assertEqual(sug.preresolve(docker), docker)
+        self.assertEqual(sug.offload(), [])
+
+    def test_preresolve_once_when_sharded(self):
+        path_pids = os.path.join(self.dir.name, "pids.txt")
+
+        class _Resolver(DnsCache):
+            def resolve_all(self, hosts):
+                with open(path_pids, "a", encoding="utf8") as f:
+                    f.write(f"{os.getpid()}\n")
+                return super(_Resolver, self).resolve_all(hosts)
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        docker = [f"https://127.0.0.1:{port}/auth/register?{i}" for i in range(8)]
+        sug = SSPanelHostsClassifier(docker=docker, resolver=_Resolver(self.path), workers=2, log_level="CRITICAL")
+        sug.local_proxy = {}
+        sug.go(power=4)
+        with open(path_pids, "r", encoding="utf8") as f:
+            self.assertEqual(f.read().split(), [str(os.getpid())])
+        # 工作进程的事件计数回传主进程，不重复计入继承的计数
+        self.assertEqual(sum(sug.events.counter.values()), 8)
+        self.assertTrue(os.path.exists(self.path))
+        self.assertFalse([name for name in os.listdir(self.dir.name) if name.endswith(".tmp")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from loguru import logger
+
+from services.utils import EventLog
+from services.utils.toolbox.toolbox import QueuedSink
+
+
+class EventLogTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.records = []
+        self.handler = logger.add(lambda m: self.records.append(m.record), level="DEBUG", format="{message}")
+
+    def tearDown(self) -> None:
+        logger.remove(self.handler)
+
+    def test_level_and_summary(self):
+        calls = []
+
+        def _progress():
+            calls.append(1)
+            return "1/2"
+
+        events = EventLog(level="WARNING", interval=None, progress=_progress)
+        events.log("SUCCESS", "实例正常", url="https://a.com")
+        # 未达到级别的事件不格式化消息
+        self.assertEqual((self.records, calls), ([], []))
+
+        events.log("ERROR", "响应超时", url="https://b.com", label="响应超时")
+        self.assertEqual(len(self.records), 1)
+        record = self.records[0]
+        self.assertEqual(record["message"], "响应超时 - [1/2] url=https://b.com label=响应超时")
+        self.assertEqual(record["extra"]["url"], "https://b.com")
+        self.assertEqual(record["extra"]["event"], "响应超时")
+
+        events.summary(final=True)
+        self.assertIn("实例正常=1", self.records[-1]["message"])
+        self.assertIn("响应超时=1", self.records[-1]["message"])
+
+    def test_sample(self):
+        events = EventLog(sample=0, interval=0)
+        events.log("ERROR", "流量阻断", url="https://c.com")
+        messages = [r["message"] for r in self.records]
+        self.assertEqual(len(messages), 1)
+        self.assertTrue(messages[0].startswith("事件汇总"))
+        self.assertEqual(events.counter["流量阻断"], 1)
+
+
+class QueuedSinkTest(unittest.TestCase):
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            path = os.path.join(dir_, "runtime.log")
+            sink = QueuedSink(path, rotation=64, retention=3600)
+            for i in range(10):
+                sink.write(f"line {i}\n")
+            sink.stop()
+            lines = []
+            for name in sorted(os.listdir(dir_)):
+                with open(os.path.join(dir_, name), encoding="utf8") as f:
+                    lines += f.read().splitlines()
+            self.assertEqual(sorted(lines), sorted(f"line {i}" for i in range(10)))
+            # 超出大小上限后轮转
+            self.assertTrue(any(name != "runtime.log" for name in os.listdir(dir_)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import glob
+import os
+import unittest
+
+from services.sspanel_mining.fast_path import Page
+from services.sspanel_mining.rules import ROOKIE_RULES
+
+DIR_PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+
+
+def _facts(page: Page):
+    return (
+        page.has_id("passwd"),
+        page.has_id("email_verify"),
+        page.has_tag("select"),
+        page.footer(),
+        page.labels(),
+    )
+
+
+class FastPathParityTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.pages = {}
+        for path in sorted(glob.glob(os.path.join(DIR_PAGES, "*.html"))):
+            with open(path, "r", encoding="utf8") as file:
+                self.pages[os.path.basename(path)] = file.read()
+        self.assertTrue(self.pages)
+
+    def test_parity(self):
+        for name, html in self.pages.items():
+            with self.subTest(page=name):
+                self.assertEqual(_facts(Page(html)), _facts(Page(html, fast=False)))
+                rookie = (Page(html, rules=ROOKIE_RULES).labels(), Page(html, rules=ROOKIE_RULES, fast=False).labels())
+                self.assertEqual(*rookie)
+
+    def test_fast_path_decides(self):
+        # 常规注册页无需构建 DOM
+        for name in ("normal.html", "email_verify.html", "email_limit.html", "invitation.html", "geetest.html"):
+            page = Page(self.pages[name])
+            _facts(page)
+            self.assertFalse(page.fallback, name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from services.sspanel_mining import HostCatalog
+
+
+class HostCatalogTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.dir_catalog = os.path.join(self.dir.name, "catalog")
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def _dataset(self, day: str, urls) -> str:
+        path = os.path.join(self.dir.name, f"dataset_{day}.txt")
+        with open(path, "w", encoding="utf8") as f:
+            f.write("\n".join(urls) + "\n\n")
+        return path
+
+    def test_ingest(self):
+        catalog = HostCatalog(self.dir_catalog, stride=4)
+        paths = [
+            self._dataset("2022-02-01", [f"https://{i:03d}.com/auth/register" for i in range(0, 60)]),
+            self._dataset("2022-02-05", [f"https://{i:03d}.com/auth/register" for i in range(40, 100)]),
+        ]
+        self.assertEqual(catalog.ingest(paths), 100)
+        self.assertEqual(catalog.ingest(paths), 0)
+        self.assertEqual(len(catalog), 100)
+
+        self.assertEqual(catalog.get("https://000.com/auth/register"), ("2022-02-01", "2022-02-01"))
+        self.assertEqual(catalog.get("https://050.com/auth/register"), ("2022-02-01", "2022-02-05"))
+        self.assertEqual(catalog.get("https://099.com/auth/register"), ("2022-02-05", "2022-02-05"))
+        self.assertNotIn("https://000.com", catalog)
+        self.assertNotIn("https://100.com/auth/register", catalog)
+        self.assertNotIn("http://000.com/auth/register", catalog)
+
+        urls = list(catalog.iter_hosts())
+        self.assertEqual(urls, sorted(urls))
+        self.assertEqual(len(list(catalog.iter_hosts(since="2022-02-05"))), 60)
+        self.assertEqual(len(list(catalog.iter_hosts(days=3, today=date(2022, 2, 6)))), 60)
+
+        # 变更后的数据集重新并入
+        paths.append(self._dataset("2022-02-05", ["https://aaa.com/auth/register"]))
+        self.assertEqual(catalog.ingest(paths), 1)
+        self.assertIn("https://aaa.com/auth/register", catalog)
+        catalog.close()
+
+    def test_stale_index(self):
+        catalog = HostCatalog(self.dir_catalog, stride=2)
+        catalog.ingest([self._dataset("2022-02-01", ["https://a.com", "https://b.com", "https://c.com"])])
+        catalog.close()
+        os.remove(catalog.path_index)
+        self.assertIn("https://c.com", HostCatalog(self.dir_catalog, stride=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from services.sspanel_mining import HostStatusStore, Label, Record
+
+DAY = 24 * 3600
+
+
+class HostStatusStoreTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = HostStatusStore(os.path.join(self.dir.name, "hosts.sqlite3"))
+
+    def tearDown(self) -> None:
+        self.store.close()
+        self.dir.cleanup()
+
+    def test_ttl(self):
+        self.assertEqual(self.store.ttl_of("危险通信(HTTP)"), 30 * DAY)
+        self.assertEqual(self.store.ttl_of("限制注册(邀请)"), 3 * DAY)
+        self.assertEqual(self.store.ttl_of("拒绝注册;Normal"), 1 * DAY)
+        self.assertEqual(self.store.ttl_of("未登记标签"), self.store.default_ttl)
+        self.assertLess(self.store.ttl_of("响应超时", 1), self.store.ttl_of("响应超时", 3))
+        self.assertEqual(self.store.ttl_of("响应超时", 100), self.store.failure_ttl_cap)
+
+    def test_incremental(self):
+        now = 1_000_000_000
+        self.store.record([
+            Record("https://a.com", Label.CLOSED),
+            Record("https://b.com", Label.NORMAL),
+            Record("http://c.com", Label.DANGER_HTTP),
+            Record("https://d.com", Label.TIMEOUT, retries=2),
+        ], when=now)
+        self.store.record([{"url": "https://d.com", "label": "响应超时", "retries": 2}], when=now)
+        self.assertEqual(self.store.get("https://d.com")["failures"], 2)
+
+        urls = ["https://A.com/", "https://b.com", "http://c.com", "https://d.com", "https://new.com"]
+        self.assertEqual(self.store.due(urls, now=now + 2 * DAY), ["https://b.com", "https://d.com", "https://new.com"])
+        self.assertEqual(self.store.due(urls, now=now + 60), ["https://new.com"])
+
+        # 恢复正常后清零连续失败次数
+        self.store.record([Record("https://d.com", Label.NORMAL)], when=now)
+        self.assertEqual(self.store.get("https://d.com")["failures"], 0)
+
+        exported = sorted(self.store.export(urls[:2]), key=lambda x: x["url"])
+        self.assertEqual(exported, [
+            {"url": "https://a.com", "label": "拒绝注册", "retries": 0},
+            {"url": "https://b.com", "label": "Normal", "retries": 0},
+        ])
+        self.assertEqual(len(self.store.export()), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
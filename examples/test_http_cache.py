@@ -0,0 +1,100 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.sspanel_mining import SSPanelHostsClassifier
+from services.sspanel_mining.fast_path import CachedPage, Page
+from services.utils import HttpCache
+
+PAGE = b"<html><body><form><input id='passwd'><input id='email_verify'></form>" \
+       b"<script>grecaptcha.getResponse()</script></body></html>"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpCacheTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "responses.sqlite3")
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_lru(self):
+        cache = HttpCache(self.path, capacity=3, evict_every=1)
+        for i in range(3):
+            cache.put(f"https://{i}.com", {"labels": []}, etag=str(i))
+            time.sleep(0.01)
+        # 访问最早写入的条目，使其不被淘汰
+        self.assertEqual(cache.get("https://0.com")["etag"], "0")
+        cache.put("https://3.com", {"labels": []}, last_modified="Mon")
+        self.assertEqual(len(cache), 3)
+        self.assertIsNone(cache.get("https://1.com"))
+        self.assertEqual(HttpCache.validators(cache.get("https://3.com")), {"If-Modified-Since": "Mon"})
+
+        # 无校验器且未开启 ttl 的条目不写入
+        cache.put("https://4.com", {"labels": []})
+        self.assertIsNone(cache.get("https://4.com"))
+        cache.close()
+
+    def test_revalidate(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/auth/register"
+        try:
+            cache = HttpCache(self.path)
+            sug = SSPanelHostsClassifier(docker=[], http_cache=cache)
+
+            page = sug._load_page(url)
+            self.assertIsInstance(page, Page)
+            page = sug._load_page(url)
+            self.assertIsInstance(page, CachedPage)
+            self.assertEqual(_Handler.requests, [None, '"v1"'])
+            self.assertEqual(cache.revalidated, 1)
+            self.assertTrue(page.has_id("passwd") and page.has_id("email_verify"))
+            self.assertFalse(page.has_tag("select"))
+            self.assertEqual(page.labels(), {"Google reCAPTCHA"})
+
+            # 信任期内不发出请求
+            cache.ttl = 3600
+            self.assertIsInstance(sug._load_page(url), CachedPage)
+            self.assertEqual(len(_Handler.requests), 2)
+            self.assertEqual(cache.hits, 1)
+
+            # 规则表变更后缓存的标签过期，重新请求并分类
+            cached = cache.get(url)
+            cache.put(url, dict(cached["facts"], rules="stale"), etag=cached["etag"])
+            self.assertIsInstance(sug._load_page(url), Page)
+            self.assertEqual(_Handler.requests, [None, '"v1"', None])
+            self.assertIsInstance(sug._load_page(url), CachedPage)
+            self.assertEqual(cache.hits, 2)
+            sug.killer()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
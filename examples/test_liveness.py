@@ -0,0 +1,75 @@
+from gevent import monkey
+
+monkey.patch_all()
+import os
+import socket
+import tempfile
+import unittest
+
+from services.sspanel_mining import SSPanelHostsClassifier
+from services.utils import LivenessProbe
+
+
+def _closed_port() -> int:
+    # 绑定后立即释放，端口上无监听
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LivenessProbeTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(16)
+        self.open_port = self.listener.getsockname()[1]
+        self.closed_port = _closed_port()
+
+    def tearDown(self) -> None:
+        self.listener.close()
+
+    def test_tcp(self):
+        probe = LivenessProbe(timeout=1)
+        self.assertTrue(probe.probe(("127.0.0.1", self.open_port)))
+        self.assertFalse(probe.probe(("127.0.0.1", self.closed_port)))
+        self.assertEqual(
+            probe.probe_all([("127.0.0.1", self.open_port), ("127.0.0.1", self.closed_port)]),
+            {("127.0.0.1", self.closed_port)}
+        )
+
+    def test_tls_handshake_timeout(self):
+        # 接受连接但不响应握手
+        probe = LivenessProbe(timeout=0.3, tls=True)
+        self.assertFalse(probe.probe(("127.0.0.1", self.open_port)))
+
+    def test_prefilter(self):
+        sug = SSPanelHostsClassifier(docker=[], prober=LivenessProbe(timeout=1))
+        sug.local_proxy = {}
+        alive = f"https://127.0.0.1:{self.open_port}/auth/register"
+        dead = f"https://127.0.0.1:{self.closed_port}/auth/register"
+        self.assertEqual(sug.prefilter([alive, dead, "http://127.0.0.1/auth/register"]),
+                         [alive, "http://127.0.0.1/auth/register"])
+        self.assertEqual([r.text() for r in sug.offload()], ["端口不可达"])
+
+    def test_prefilter_once_when_sharded(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            path_pids = os.path.join(dir_, "pids.txt")
+
+            class _Probe(LivenessProbe):
+                def probe_all(self, addresses):
+                    with open(path_pids, "a", encoding="utf8") as f:
+                        f.write(f"{os.getpid()}\n")
+                    return super(_Probe, self).probe_all(addresses)
+
+            docker = [f"https://127.0.0.1:{self.open_port}/auth/register?{i}" for i in range(8)]
+            sug = SSPanelHostsClassifier(docker=docker, prober=_Probe(timeout=1), workers=2,
+                                         task_timeout=1, log_level="CRITICAL")
+            sug.local_proxy = {}
+            sug.go(power=4)
+            with open(path_pids, "r", encoding="utf8") as f:
+                self.assertEqual(f.read().split(), [str(os.getpid())])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+from gevent import monkey
+
+monkey.patch_all()
+import os
+import tempfile
+import unittest
+
+from services.sspanel_mining import Label, Record, SSPanelStaffChecker
+from services.sspanel_mining.records import label_text, parse_label
+from services.utils import Checkpoint, JsonlSink
+
+
+class RecordTest(unittest.TestCase):
+
+    def test_label_text(self):
+        label = Label.GEETEST | Label.RECAPTCHA
+        self.assertEqual(label_text(label), "Google reCAPTCHA;GeeTest Validation")
+        self.assertEqual(str(Label.CLOSED), "拒绝注册")
+        self.assertEqual(Record("https://a.com", Label.REQUEST_ERROR, status=403).text(), "请求异常(ERROR:403)")
+        self.assertEqual(parse_label("Google reCAPTCHA;GeeTest Validation"), (label, None))
+        self.assertEqual(parse_label("请求异常(ERROR:502)"), (Label.REQUEST_ERROR, 502))
+
+    def test_pack(self):
+        record = Record("https://a.com/auth/register", Label.TIMEOUT, retries=2, elapsed=1.23456, n_bytes=1024)
+        self.assertEqual(record.pack(), {"u": "https://a.com/auth/register", "l": int(Label.TIMEOUT),
+                                         "r": 2, "t": 1.235, "b": 1024})
+        self.assertEqual(Record.load(record.pack()).to_dict(),
+                         {"url": "https://a.com/auth/register", "label": "响应超时", "retries": 2})
+        # 旧版本落盘的结果
+        self.assertEqual(Record.load({"url": "https://a.com", "label": "请求异常(ERROR:404)"}),
+                         Record("https://a.com", Label.REQUEST_ERROR, status=404))
+
+    def test_sink(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            sink = JsonlSink(os.path.join(dir_, "stream.jsonl"))
+            sink.write(Record("https://a.com", Label.NORMAL, status=200, elapsed=0.5, n_bytes=2048))
+            sink.close()
+            self.assertEqual([Record.load(r) for r in sink.load()],
+                             [Record("https://a.com", Label.NORMAL, status=200, elapsed=0.5, n_bytes=2048)])
+
+    def test_checker_offload(self):
+        checker = SSPanelStaffChecker(docker=[])
+        checker._protocol_hook("https://a.com/tos", Label.LOSS_TOS, True)
+        checker._protocol_hook("https://a.com/staff", Label.LOSS_STAFF, False)
+        checker._protocol_hook("https://a.com", Label.ROOKIE, True)
+        checker._protocol_hook("https://b.com/tos", Label.LOSS_TOS, False)
+        self.assertEqual(checker.offload(), [
+            {"url": "https://a.com", "labels": "loss_tos;rookie"},
+            {"url": "https://b.com", "labels": ""},
+        ])
+
+    def test_checker_checkpoint(self):
+        with tempfile.TemporaryDirectory() as dir_:
+            path = os.path.join(dir_, "checker.jsonl")
+
+            class _Checker(SSPanelStaffChecker):
+                def control_driver(self, url: str):
+                    self._protocol_hook(url, Label.ROOKIE, True)
+
+            checker = _Checker(docker=["https://a.com/auth/register"], checkpoint=Checkpoint(path))
+            checker.go(power=2)
+            self.assertEqual(checker.offload(), [{"url": "https://a.com", "labels": "rookie"}])
+
+            # 续传：全部任务已完成，结果由检查点重放
+            checker = _Checker(docker=["https://a.com/auth/register"], checkpoint=Checkpoint(path))
+            checker.go(power=2)
+            self.assertEqual(checker.metrics.completed, 0)
+            self.assertEqual(checker.offload(), [{"url": "https://a.com", "labels": "rookie"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
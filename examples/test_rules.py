@@ -0,0 +1,55 @@
+import unittest
+
+from services.sspanel_mining.rules import (
+    Rule,
+    RuleSet,
+    REGISTER_RULES,
+    ROOKIE_RULES,
+    SOURCE_TEXT,
+    LABEL_CLOSED,
+    LABEL_INVITATION,
+    LABEL_RECAPTCHA,
+    LABEL_GEETEST,
+    LABEL_ROOKIE,
+)
+
+
+class _Soup:
+    """记录 text 属性的读取次数"""
+
+    def __init__(self, text: str):
+        self._text = text
+        self.reads = 0
+
+    @property
+    def text(self):
+        self.reads += 1
+        return self._text
+
+
+class RuleSetTest(unittest.TestCase):
+
+    def test_register_rules(self):
+        html = '<script>grecaptcha.getResponse()</script><div class="geetest"></div><p>请填写邀请码</p>'
+        soup = _Soup("Registration closed")
+        labels = REGISTER_RULES.scan(html=html, soup=soup)
+        self.assertEqual(labels, {LABEL_CLOSED, LABEL_INVITATION, LABEL_RECAPTCHA, LABEL_GEETEST})
+        self.assertEqual(soup.reads, 1)
+
+        self.assertEqual(REGISTER_RULES.scan(html="<input id='passwd'>", soup=_Soup("register")), set())
+
+    def test_rookie_rules(self):
+        self.assertEqual(ROOKIE_RULES.scan(text="一键三连。素质三连"), {LABEL_ROOKIE})
+        self.assertEqual(ROOKIE_RULES.scan(text="normal"), set())
+
+    def test_overlapping_patterns(self):
+        rules = RuleSet([
+            Rule("a", ("closed",), source=SOURCE_TEXT),
+            Rule("b", ("sed",), source=SOURCE_TEXT),
+            Rule("c", ("SSPANEL",), ignore_case=True),
+        ])
+        self.assertEqual(rules.scan(html="Powered by SSPanel", text="closed"), {"a", "b", "c"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+from gevent import monkey
+
+monkey.patch_all()
+import unittest
+
+import gevent
+
+from services.utils import ScraperPool
+
+
+class _Session:
+    def close(self):
+        self.closed = True
+
+
+class ScraperPoolTest(unittest.TestCase):
+
+    def test_bounded(self):
+        pool = ScraperPool(size=2, factory=_Session)
+        peak = []
+
+        def _task(i):
+            with pool.session(f"host{i}"):
+                peak.append(pool.created)
+                gevent.sleep(0.01)
+
+        gevent.joinall([gevent.spawn(_task, i) for i in range(10)])
+        self.assertEqual(max(peak), 2)
+
+    def test_host_affinity(self):
+        pool = ScraperPool(size=4, factory=_Session)
+        a, b = pool.acquire("a.com"), pool.acquire("b.com")
+        pool.release(a, "a.com")
+        pool.release(b, "b.com")
+        self.assertIs(pool.acquire("b.com"), b)
+        self.assertIs(pool.acquire("a.com"), a)
+
+    def test_killed_waiter(self):
+        pool = ScraperPool(size=1, factory=_Session)
+        session = pool.acquire()
+        dead = gevent.spawn(pool.acquire)
+        gevent.sleep(0)
+        alive = gevent.spawn(pool.acquire)
+        gevent.sleep(0)
+        # 等待中的协程被超时中断，空闲会话须交给其余等待者
+        dead.kill(gevent.Timeout)
+        pool.release(session)
+        self.assertIs(alive.get(timeout=1), session)
+        self.assertFalse(pool._waiters)
+
+    def test_close(self):
+        pool = ScraperPool(size=1, factory=_Session)
+        with pool.session() as session:
+            pass
+        pool.close()
+        self.assertTrue(session.closed)
+        self.assertEqual(pool.created, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
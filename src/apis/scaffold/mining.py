@@ -8,18 +8,40 @@ import os.path
 import random
 import sys
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Union
 
 from services.settings import (
     DIR_OUTPUT_STORE_COLLECTOR,
     DIR_OUTPUT_STORE_CLASSIFIER,
+    DIR_CHECKPOINT,
+    DIR_COOKIES,
+    DIR_HTTP_CACHE,
+    DIR_HOST_STATUS,
+    DIR_DNS_CACHE,
+    DIR_DATASET_MIRROR,
+    DIR_HOST_CATALOG,
     TIME_ZONE_CN,
     logger,
 
 )
 from services.sspanel_mining import (
     SSPanelHostsClassifier,
-    SSPanelHostsCollector
+    SSPanelHostsCollector,
+    HostCatalog,
+    HostStatusStore,
+    Record,
+)
+from services.sspanel_mining.host_store import FAILURE_LABELS
+from services.utils import (
+    JsonlSink,
+    ResultSink,
+    Checkpoint,
+    ClearanceCookieStore,
+    DatasetMirror,
+    HttpCache,
+    DnsCache,
+    LivenessProbe,
+    TimeoutPolicy,
 )
 
 
@@ -28,6 +50,10 @@ class V2RSSMiningToolkit:
     FOCUS_SUFFIX = ".txt"
     FOCUS_PREFIX = "dataset"
 
+    # 母仓库数据集链接模版，以文件名填充
+    REMOTE_TEMPLATE = "https://raw.githubusercontent.com/RobAI-Lab/sspanel-mining/main/src/database" \
+                      "/sspanel_hosts/{}"
+
     @staticmethod
     def create_env(path_file_txt: str) -> bool:
         """
@@ -63,30 +89,32 @@ class V2RSSMiningToolkit:
                 f.write(f"{i}\n")
 
     @staticmethod
-    def load_sspanel_hosts() -> Optional[List[str]]:
+    def load_host_catalog() -> HostCatalog:
         """
-        sspanel-预处理数据集 获取过去X天的历史数据
+        站点名录，并入 Collector 尚未并入或已变更的输出
 
         :return:
         """
-        # 待分类链接
-        urls = []
-
-        # 识别并读回 Collector 输出
-        for t in os.listdir(DIR_OUTPUT_STORE_COLLECTOR):
-            if t.endswith(V2RSSMiningToolkit.FOCUS_SUFFIX) and t.startswith(V2RSSMiningToolkit.FOCUS_PREFIX):
-                # 补全路径模版
-                path_file_txt = os.path.join(DIR_OUTPUT_STORE_COLLECTOR, t)
-                # 读回 Collector 输出
-                with open(path_file_txt, "r", encoding="utf8") as f:
-                    for url in f.read().split("\n"):
-                        urls.append(url)
-
-        # 清洗杂质
-        urls = {i for i in urls if i}
+        catalog = HostCatalog(DIR_HOST_CATALOG)
+        added = catalog.ingest(
+            os.path.join(DIR_OUTPUT_STORE_COLLECTOR, t)
+            for t in sorted(os.listdir(DIR_OUTPUT_STORE_COLLECTOR))
+            if t.endswith(V2RSSMiningToolkit.FOCUS_SUFFIX) and t.startswith(V2RSSMiningToolkit.FOCUS_PREFIX)
+        )
+        if added:
+            logger.info(f"站点名录 - added={added} total={len(catalog)}")
+        return catalog
 
-        # 返回参数
-        return list(urls)
+    @staticmethod
+    def load_sspanel_hosts(days: Optional[int] = None) -> Optional[List[str]]:
+        """
+        sspanel-预处理数据集 获取过去X天的历史数据
+
+        :param days: 仅返回最近 days 天内被采集过的站点，缺省返回全部
+        :return:
+        """
+        catalog = V2RSSMiningToolkit.load_host_catalog()
+        return list(catalog.iter_hosts(days=days))
 
     @staticmethod
     def output_foul_dataset(dir_output: str, docker: dict, path_output: Optional[str] = None):
@@ -150,9 +178,9 @@ class V2RSSMiningToolkit:
         try:
             with open(path_output_, "w", encoding="utf8", newline="") as f:
                 writer = csv.writer(f)
-                writer.writerow(["url", "label"])
+                writer.writerow(["url", "label", "retries"])
                 for context in docker:
-                    writer.writerow([context["url"], context["label"]])
+                    writer.writerow([context["url"], context["label"], context.get("retries", 0)])
             
             # 创建备份文件
             backup_filename = os.path.basename(path_output_)
@@ -175,9 +203,9 @@ class V2RSSMiningToolkit:
             try:
                 with open(fallback_path, "w", encoding="utf8", newline="") as f:
                     writer = csv.writer(f)
-                    writer.writerow(["url", "label"])
+                    writer.writerow(["url", "label", "retries"])
                     for context in docker:
-                        writer.writerow([context["url"], context["label"]])
+                        writer.writerow([context["url"], context["label"], context.get("retries", 0)])
                 logger.success(f"数据已保存到备用位置: {fallback_path}")
                 return fallback_path
             except Exception as e2:
@@ -185,11 +213,46 @@ class V2RSSMiningToolkit:
                 return ""
 
     @staticmethod
-    def preview(path_output: str, docker: Optional[list] = None):
+    def merge_stream(dir_output: str, sink: ResultSink) -> str:
+        """
+        合并流式结果：读回分类过程中逐批落盘的结果，排序后导出 mining_*.csv
+
+        导出成功后移除流式缓存；导出失败时保留缓存，便于人工恢复。
+        :param dir_output:
+        :param sink:
+        :return:
+        """
+        sink.close()
+        path_output = V2RSSMiningToolkit.output_cleaning_dataset(
+            dir_output, [Record.load(packed).to_dict() for packed in sink.load()]
+        )
+        if path_output and os.path.exists(sink.path):
+            os.remove(sink.path)
+        return path_output
+
+    @staticmethod
+    def merge_store(dir_output: str, sink: ResultSink, store: HostStatusStore, urls: list) -> str:
+        """
+        增量模式下的结果导出：本次结果写入站点状态库后，由状态库导出全部站点的最新标签
+
+        :param dir_output:
+        :param sink:
+        :param store:
+        :param urls: 数据集中的全部链接，含本次跳过检测的站点
+        :return:
+        """
+        sink.close()
+        path_output = V2RSSMiningToolkit.output_cleaning_dataset(dir_output, store.export(urls))
+        if path_output and os.path.exists(sink.path):
+            os.remove(sink.path)
+        return path_output
+
+    @staticmethod
+    def preview(path_output: str, docker: Optional[Union[list, int]] = None):
         """
 
         :param path_output:
-        :param docker:
+        :param docker: 分类结果或结果数
         :return:
         """
         # Windows 系统下自动打开洗好的导出文件
@@ -203,35 +266,74 @@ class V2RSSMiningToolkit:
             return False
 
     @staticmethod
-    def load_sspanel_hosts_remote(batch: Optional[int] = 1):
+    def load_sspanel_hosts_remote(
+            batch: Optional[int] = 1,
+            url_template: Optional[str] = None,
+            dir_mirror: Optional[str] = None,
+    ):
         """
         sspanel-预处理数据集
         访问 https://github.com/RobAI-Lab/sspanel-mining/tree/main/database/staff_hosts
+
+        并发拉取过去 batch 天的数据集并镜像至本地，已下载的数据集以条件请求复检，逐行读回。
         :param batch: 获取过去X天的历史数据
+        :param url_template: 远程数据集链接模版，缺省为母仓库
+        :param dir_mirror: 本地镜像目录
         :return:
         """
-        import requests
         from datetime import datetime, timedelta
-        from bs4 import BeautifulSoup
 
-        # 初始化数据集
-        url_ = "https://raw.githubusercontent.com/RobAI-Lab/sspanel-mining/main/src/database" \
-               "/sspanel_hosts/dataset_{}.txt"
-        urls = []
         today_ = datetime.now()
-
-        # 获取过去X天的历史数据
-        for _ in range(batch):
-            today_ -= timedelta(days=1)
-            focus_ = url_.format(str(today_).split(" ")[0])
-            res = requests.get(focus_)
-            if res.status_code == 200:
-                logger.info(f"正在下载数据集 {focus_}")
-                soup = BeautifulSoup(res.text, "html.parser")
-                urls += soup.text.split('\n')
+        names = [
+            f"{V2RSSMiningToolkit.FOCUS_PREFIX}_{(today_ - timedelta(days=i + 1)).strftime('%Y-%m-%d')}"
+            f"{V2RSSMiningToolkit.FOCUS_SUFFIX}"
+            for i in range(batch)
+        ]
+        mirror = DatasetMirror(
+            dir_mirror=dir_mirror or DIR_DATASET_MIRROR,
+            url_template=url_template or V2RSSMiningToolkit.REMOTE_TEMPLATE,
+        )
 
         # 返回参数
-        return list(set(urls))
+        return list(set(DatasetMirror.iter_lines(mirror.fetch_all(names))))
+
+    @staticmethod
+    def load_priority_hints():
+        """
+        依据最新一次的分类结果生成优先级函数
+
+        历史正常的站点最先检测，新站点次之，历史上检测失败的站点排在最后。
+        :return: url -> rank，rank 越小越先检测；无历史分类结果时返回 None
+        """
+        if not os.path.exists(DIR_OUTPUT_STORE_CLASSIFIER):
+            return None
+        classifier_outputs = [
+            os.path.join(DIR_OUTPUT_STORE_CLASSIFIER, i)
+            for i in os.listdir(DIR_OUTPUT_STORE_CLASSIFIER)
+            if i.startswith("mining") and i.endswith(".csv")
+        ]
+        if not classifier_outputs:
+            return None
+
+        with open(max(classifier_outputs), "r", encoding="utf8") as f:
+            history = {row["url"]: row["label"] for row in csv.DictReader(f) if row.get("url")}
+
+        def _rank(url: str) -> int:
+            label = history.get(url)
+            if label is None:
+                return 2
+            if label.startswith("限制注册"):
+                return 1
+            if label.startswith(("请求异常", "流量阻断", "代理异常", "响应超时", "域名失效", "端口不可达")):
+                return 4
+            if label.startswith(("拒绝注册", "危险通信", "未授权站点", "CloudflareDefenseV2", "超出时限")):
+                return 3
+            if label.startswith(("Normal", "Google reCAPTCHA", "Email Validation", "GeeTest Validation")):
+                return 0
+            # 未登记的标签按新站点处理
+            return 2
+
+        return _rank
 
     @staticmethod
     def load_classified_hosts(filter_: Optional[bool] = True) -> Optional[list]:
@@ -269,14 +371,12 @@ class V2RSSMiningToolkit:
             data = [element["url"] for element in data]
             return data
 
-        # 过滤掉无价值的标签数据
+        # 过滤掉无价值的标签数据：危险通信、请求异常、域名失效，以及重试耗尽的瞬时故障
+        excluded = ("危险通信", "请求异常", "域名失效") + FAILURE_LABELS
         filter_docker = []
         for element in data:
             url_, label_ = element["url"], element["label"]
-            if (
-                    "危险通信" in label_
-                    or "请求异常" in label_
-            ):
+            if any(label in label_ for label in excluded):
                 continue
             filter_docker.append(url_)
 
@@ -329,17 +429,71 @@ def run_collector(env: Optional[str] = "development", silence: Optional[bool] =
         # Collector 使用 `a` 指针方式插入新数据，此处使用 data_cleaning() 去重
         V2RSSMiningToolkit.data_cleaning(path_file_txt)
 
-
-def run_classifier(power: Optional[int] = 16, source: Optional[str] = "local", batch: Optional[int] = 1):
+        # 统计本次采集到的新站点并并入站点名录
+        catalog = HostCatalog(DIR_HOST_CATALOG)
+        with open(path_file_txt, "r", encoding="utf8") as f:
+            fresh = sum(1 for url in f if url.strip() and url.strip() not in catalog)
+        catalog.ingest([path_file_txt])
+        catalog.close()
+        logger.success(f"采集完毕 - fresh={fresh} total={len(catalog)}")
+
+
+def run_classifier(
+        power: Optional[int] = 16,
+        source: Optional[str] = "local",
+        batch: Optional[int] = 1,
+        days: Optional[int] = None,
+        host_limit: Optional[int] = None,
+        adaptive: Optional[bool] = False,
+        workers: Optional[int] = 1,
+        task_timeout: Optional[float] = None,
+        budget: Optional[float] = None,
+        retries: Optional[int] = 2,
+        prioritize: Optional[bool] = False,
+        resume: Optional[bool] = False,
+        max_body: Optional[int] = 2 * 1024 * 1024,
+        http_cache: Optional[bool] = True,
+        cache_ttl: Optional[float] = None,
+        incremental: Optional[bool] = False,
+        preresolve: Optional[bool] = True,
+        probe: Optional[bool] = False,
+        probe_tls: Optional[bool] = False,
+        connect_timeout: Optional[float] = 10,
+        read_timeout: Optional[float] = 60,
+        adaptive_timeout: Optional[bool] = False,
+        log_level: Optional[str] = "WARNING",
+        log_sample: Optional[float] = 1.0,
+):
     """
 
     :param batch: batch 应是自然数，仅在 source==remote 时生效，用于指定拉取的数据范围。
         - batch=1 表示拉取昨天的数据（默认），batch=2 表示拉取昨天+前天的数据，以此类推往前堆叠
         - 当设置的 batch 大于母仓库存储量时会自动调整运行了逻辑，防止溢出。
+    :param days: 仅在 source==local 时生效，只分类最近 days 天内被采集过的站点，缺省分类站点名录中的全部站点
     :param source: within [local remote] 指定数据源，仅对分类器生效
         - local：使用本地 Collector 采集的数据进行分类
         - remote：使用 SSPanel-Mining 母仓库数据进行分类（需要下载数据集）
     :param power: 采集功率
+    :param host_limit: 单个站点的并发请求上限，缺省不限制
+    :param adaptive: 自适应功率，以 power 为初始值，依据吞吐量与网络异常率在运行中自动伸缩
+    :param workers: 工作进程数，大于 1 时按站点哈希分片并行分类，power 均摊到各个进程
+    :param task_timeout: 单个链接的处理时限（秒），超时的链接标注为“超出时限”
+    :param budget: 整体运行时限（秒），到期后中断在途任务并放弃剩余任务
+    :param retries: 超时、连接中断、代理异常等瞬时故障的最大重试次数，重试按指数退避延后执行
+    :param prioritize: 按上一次分类结果排定检测顺序，历史正常的站点优先，历史失败的站点靠后
+    :param resume: 断点续传，跳过上一次中断的运行中已完成的链接并沿用其结果
+    :param max_body: 单个页面的下载字节上限，注册表单与脚注均已出现后提前结束下载
+    :param http_cache: 启用响应缓存，复检时发起条件请求，页面未变更（304）则沿用上一次的页面事实
+    :param cache_ttl: 信任缓存的时长（秒），期限内的站点直接沿用缓存而不发出请求，缺省总是发起条件请求
+    :param incremental: 增量分类，只检测新站点与标签复检间隔已到期的站点，其余站点沿用站点状态库中的标签
+    :param preresolve: 分类前并发预解析全部域名，不存在的域名标注为“域名失效”且数日内不再重复解析
+    :param probe: 分类前以短超时探测站点端口，不可达的站点标注为“端口不可达”，不进入完整检测
+    :param probe_tls: 存活探测时完成 TLS 握手
+    :param connect_timeout: 连接超时（秒），自适应模式下为上限
+    :param read_timeout: 读取超时（秒），自适应模式下为上限
+    :param adaptive_timeout: 依据本次运行中响应延迟的 p99 推导连接/读取超时，失联站点更快放弃
+    :param log_level: 逐条站点日志的最低级别，其余站点事件只计入定期输出的汇总行
+    :param log_sample: 达到级别的站点日志的输出比例，within [0, 1]
     :return:
     """
 
@@ -347,14 +501,18 @@ def run_classifier(power: Optional[int] = 16, source: Optional[str] = "local", b
     TODO [√]启动参数调整
     -------------------
     """
-    # 校准分类器功率
+    # 校准分类器功率，自适应模式下 power 仅作为初始值
     power = power if isinstance(power, int) else max(os.cpu_count(), 4)
-    power = os.cpu_count() * 2 if os.cpu_count() >= power else power
+    if not adaptive:
+        power = os.cpu_count() * 2 if os.cpu_count() >= power else power
 
     # 限定核心启动参数
     if source not in ["local", "remote"]:
         return
 
+    # 限定工作进程数
+    workers = workers if isinstance(workers, int) and workers > 0 else 1
+
     # 限定远程数据的获取批次
     batch = 1 if not isinstance(batch, int) else batch
     batch = 1 if batch < 1 else batch
@@ -367,14 +525,49 @@ def run_classifier(power: Optional[int] = 16, source: Optional[str] = "local", b
     """
     if source == "local":
         # 导入数据集，也即识别并读回 Collector 的输出
-        urls = V2RSSMiningToolkit.load_sspanel_hosts()
+        urls = V2RSSMiningToolkit.load_sspanel_hosts(days=days)
     else:
         # 下载母仓库数据集
         logger.info("正在访问远程数据...")
         urls = V2RSSMiningToolkit.load_sspanel_hosts_remote(batch=batch)
 
+    # 站点状态库：记录每个站点最近一次的标签、检测时间与连续失败次数
+    store = HostStatusStore(os.path.join(DIR_HOST_STATUS, "hosts.sqlite3"))
+    docker = store.due(urls) if incremental else urls
+    if incremental:
+        logger.info(f"增量分类 - pending={len(docker)} total={len(urls)}")
+
+    # 排定检测顺序
+    priority = V2RSSMiningToolkit.load_priority_hints() if prioritize else None
+
+    # 检查点：非续传模式下清除上一次运行的残留
+    checkpoint = Checkpoint(os.path.join(DIR_CHECKPOINT, "classifier.jsonl"))
+    if not resume:
+        checkpoint.purge()
+
+    # 分类结果随产随写，进程中断时已完成的部分保留在流式缓存中
+    timestamp = datetime.now(TIME_ZONE_CN).strftime('%Y-%m-%d_%H-%M-%S')
+    sink = JsonlSink(os.path.join(DIR_OUTPUT_STORE_CLASSIFIER, f"stream_{timestamp}.jsonl"))
+
     # 数据清洗
-    sug = SSPanelHostsClassifier(docker=urls)
+    sug = SSPanelHostsClassifier(
+        docker=docker, host_limit=host_limit, adaptive=bool(adaptive), sink=sink, workers=workers,
+        task_timeout=task_timeout, budget=budget, max_attempts=max(0, int(retries or 0)) + 1,
+        priority=priority, max_body=max_body,
+        # 运行指标摘要，用于横向比较代理、功率与代码版本
+        metrics_path=os.path.join(DIR_OUTPUT_STORE_CLASSIFIER, f"metrics_{timestamp}.json"),
+        checkpoint=checkpoint,
+        # 跨运行复用 Cloudflare 通行凭证
+        cookie_store=ClearanceCookieStore(os.path.join(DIR_COOKIES, "cf_clearance.json")),
+        # 跨运行的条件请求缓存
+        http_cache=HttpCache(os.path.join(DIR_HTTP_CACHE, "responses.sqlite3"), ttl=cache_ttl) if http_cache else None,
+        # 域名预解析与 NXDOMAIN 负缓存
+        resolver=DnsCache(os.path.join(DIR_DNS_CACHE, "nxdomain.json")) if preresolve else None,
+        # 端口存活探测
+        prober=LivenessProbe(tls=bool(probe_tls)) if probe else None,
+        timeouts=TimeoutPolicy(connect=connect_timeout, read=read_timeout, adaptive=bool(adaptive_timeout)),
+        log_level=log_level, log_sample=log_sample,
+    )
     sug.go(power=power)
 
     """
@@ -394,13 +587,25 @@ def run_classifier(power: Optional[int] = 16, source: Optional[str] = "local", b
     #       - 请求异常(ERROR:STATUS_CODE)：请求异常，携带相应状态码
     #       - 拒绝注册：管理员关闭注册接口
     #       - 危险通信：HTTP 直连站点
+    #       - 域名失效：域名解析返回 NXDOMAIN，未发起 HTTP 请求
+    #       - 端口不可达：存活探测中 TCP 连接（或 TLS 握手）失败，未发起 HTTP 请求
+    #       - 流量阻断/代理异常/响应超时：重试次数耗尽后仍无法完成检测，retries 列记录重试次数
+    #       - 超出时限：超出单链接处理时限或整体运行时限被强制中断
     """
-    # 存储分类结果
-    docker = sug.offload()
-    path_output = V2RSSMiningToolkit.output_cleaning_dataset(
-        dir_output=DIR_OUTPUT_STORE_CLASSIFIER,
-        docker=docker,
-    )
+    # 分类结果写入站点状态库
+    sink.close()
+    store.record(sink.load())
+
+    # 存储分类结果，增量模式下由状态库导出全量结果
+    if incremental:
+        path_output = V2RSSMiningToolkit.merge_store(DIR_OUTPUT_STORE_CLASSIFIER, sink, store, urls)
+    else:
+        path_output = V2RSSMiningToolkit.merge_stream(dir_output=DIR_OUTPUT_STORE_CLASSIFIER, sink=sink)
+    store.close()
+
+    # 导出成功后检查点失去意义
+    if path_output:
+        checkpoint.purge()
 
     # 数据预览
-    V2RSSMiningToolkit.preview(path_output=path_output, docker=docker)
+    V2RSSMiningToolkit.preview(path_output=path_output, docker=sink.count)
@@ -40,6 +40,27 @@ class Scaffold:
             classifier: Optional[bool] = False,
             source: Optional[str] = "local",
             batch: Optional[int] = 1,
+            days: Optional[int] = None,
+            host_limit: Optional[int] = None,
+            adaptive: Optional[bool] = False,
+            workers: Optional[int] = 1,
+            task_timeout: Optional[float] = None,
+            budget: Optional[float] = None,
+            retries: Optional[int] = 2,
+            prioritize: Optional[bool] = False,
+            resume: Optional[bool] = False,
+            max_body: Optional[int] = 2 * 1024 * 1024,
+            http_cache: Optional[bool] = True,
+            cache_ttl: Optional[float] = None,
+            incremental: Optional[bool] = False,
+            preresolve: Optional[bool] = True,
+            probe: Optional[bool] = False,
+            probe_tls: Optional[bool] = False,
+            connect_timeout: Optional[float] = 10,
+            read_timeout: Optional[float] = 60,
+            adaptive_timeout: Optional[bool] = False,
+            log_level: Optional[str] = "WARNING",
+            log_sample: Optional[float] = 1.0,
     ):
         """
         运行 Collector 以及 Classifier 采集并过滤基层数据
@@ -48,7 +69,24 @@ class Scaffold:
         or: python main.py mining --power=4                                 |指定分类器运行功率
         or: python main.py mining --classifier --source=local               |启动分类器，指定数据源为本地缓存
         or: python main.py mining --classifier --source=remote --batch=1    |启动分类器，指定远程数据源
+        or: python main.py mining --classifier --source=local --days=7      |只分类最近7天采集到的站点
         or: python main.py mining --collector                               |启动采集器
+        or: python main.py mining --classifier --power=256 --host_limit=2   |高功率运行，单站点至多2个并发
+        or: python main.py mining --classifier --power=20 --adaptive        |自适应功率，以20为起点自动伸缩
+        or: python main.py mining --classifier --power=256 --workers=8      |8个进程分片运行，功率均摊
+        or: python main.py mining --classifier --task_timeout=30 --budget=1800  |单链接至多30秒，整体至多30分钟
+        or: python main.py mining --classifier --prioritize                 |历史正常的站点优先检测
+        or: python main.py mining --classifier --resume                     |从上一次中断处继续分类
+        or: python main.py mining --classifier --max_body=524288            |单个页面至多下载512KB
+        or: python main.py mining --classifier --cache_ttl=43200            |12小时内检测过的站点直接沿用缓存
+        or: python main.py mining --classifier --nohttp_cache               |不使用响应缓存
+        or: python main.py mining --classifier --incremental                |只检测新站点与标签已过期的站点
+        or: python main.py mining --classifier --nopreresolve               |跳过域名预解析
+        or: python main.py mining --classifier --probe --probe_tls          |先探测端口存活并完成TLS握手
+        or: python main.py mining --classifier --connect_timeout=5 --read_timeout=90  |连接至多5秒，读取至多90秒
+        or: python main.py mining --classifier --adaptive_timeout           |依据运行中的延迟分布收紧超时
+        or: python main.py mining --classifier --log_level=DEBUG            |逐条输出全部站点日志
+        or: python main.py mining --classifier --log_sample=0.1             |仅抽样输出10%的站点日志
 
         GitHub Actions Production
         -------------------------
@@ -60,9 +98,30 @@ class Scaffold:
         :param batch: batch 应是自然数，仅在 source==remote 时生效，用于指定拉取的数据范围。
             - batch=1 表示拉取昨天的数据（默认），batch=2 表示拉取昨天+前天的数据，以此类推往前堆叠
             - 显然，当设置的 batch 大于母仓库存储量时会自动调整运行了逻辑，防止溢出。
+        :param days: 仅在 source==local 时生效，只分类最近 days 天内被采集过的站点，缺省分类站点名录中的全部站点。
         :param env: within [development production]
         :param silence: 采集器是否静默启动，默认静默。
         :param power: 分类器运行功率。
+        :param host_limit: 分类器对单个站点的并发请求上限，缺省不限制。
+        :param adaptive: 分类器自适应功率，依据吞吐量与超时/连接异常率自动伸缩，power 作为初始值。
+        :param workers: 分类器工作进程数，大于 1 时按站点哈希分片到多个进程，充分利用多核解析页面。
+        :param task_timeout: 分类器单个链接的处理时限（秒），超时链接标注为“超出时限”。
+        :param budget: 分类器整体运行时限（秒），到期后中断在途任务并放弃剩余任务。
+        :param retries: 分类器对瞬时故障（超时、连接中断、代理异常）的最大重试次数，默认 2 次。
+        :param prioritize: 分类器按上一次的分类结果排定检测顺序，历史正常的站点优先，历史失败的站点靠后。
+        :param resume: 分类器断点续传，跳过上一次中断的运行中已完成的链接。
+        :param max_body: 分类器单个页面的下载字节上限，默认 2MB；注册表单与脚注均已出现后会提前结束下载。
+        :param http_cache: 分类器响应缓存，默认开启；复检时发起条件请求，页面未变更则沿用上一次的页面事实。
+        :param cache_ttl: 信任缓存的时长（秒），期限内的站点不发出请求，缺省总是发起条件请求。
+        :param incremental: 分类器增量模式，按标签的复检间隔跳过近期检测过的站点，全量结果由站点状态库导出。
+        :param preresolve: 分类器域名预解析，默认开启；NXDOMAIN 的站点标注为“域名失效”，不进入 HTTP 检测。
+        :param probe: 分类器端口存活探测，默认关闭；不可达的站点标注为“端口不可达”，不进入 HTTP 检测。
+        :param probe_tls: 存活探测时完成 TLS 握手，仅在 probe 开启时生效。
+        :param connect_timeout: 分类器连接超时（秒），默认 10 秒。
+        :param read_timeout: 分类器读取超时（秒），默认 60 秒。
+        :param adaptive_timeout: 分类器自适应超时，以响应延迟 p99 的 3 倍为准，限定在下限与上述配置值之间。
+        :param log_level: 分类器逐条站点日志的最低级别，默认 WARNING；全部站点事件每 30 秒汇总输出一行。
+        :param log_sample: 分类器站点日志的抽样比例，默认全部输出。
         :param collector: 采集器开启权限，默认关闭。
         :param classifier: 分类器控制权限，默认关闭。
         :return:
@@ -71,4 +130,11 @@ class Scaffold:
             mining.run_collector(env=env, silence=silence)
 
         if classifier:
-            mining.run_classifier(power=power, source=source, batch=batch)
+            mining.run_classifier(power=power, source=source, batch=batch, days=days, host_limit=host_limit,
+                                  adaptive=adaptive, workers=workers, task_timeout=task_timeout,
+                                  budget=budget, retries=retries, prioritize=prioritize,
+                                  resume=resume, max_body=max_body,
+                                  http_cache=http_cache, cache_ttl=cache_ttl, incremental=incremental,
+                                  preresolve=preresolve, probe=probe, probe_tls=probe_tls,
+                                  connect_timeout=connect_timeout, read_timeout=read_timeout,
+                                  adaptive_timeout=adaptive_timeout, log_level=log_level, log_sample=log_sample)
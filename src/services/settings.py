@@ -25,6 +25,27 @@ DIR_OUTPUT_STORE_COLLECTOR = join(PROJECT_DATABASE, "sspanel_hosts")
 
 # 运行缓存:分类器输出目录
 DIR_OUTPUT_STORE_CLASSIFIER = join(DIR_OUTPUT_STORE_COLLECTOR, "classifier")
+
+# 运行缓存:断点续传检查点
+DIR_CHECKPOINT = join(PROJECT_DATABASE, "checkpoint")
+
+# 运行缓存:Cloudflare 通行凭证
+DIR_COOKIES = join(PROJECT_DATABASE, "cookies")
+
+# 运行缓存:条件请求响应缓存
+DIR_HTTP_CACHE = join(PROJECT_DATABASE, "http_cache")
+
+# 运行缓存:域名解析负缓存
+DIR_DNS_CACHE = join(PROJECT_DATABASE, "dns_cache")
+
+# 运行缓存:站点状态库
+DIR_HOST_STATUS = join(PROJECT_DATABASE, "host_status")
+
+# 运行缓存:远程数据集镜像
+DIR_DATASET_MIRROR = join(PROJECT_DATABASE, "dataset_mirror")
+
+# 运行缓存:站点名录
+DIR_HOST_CATALOG = join(PROJECT_DATABASE, "host_catalog")
 # ---------------------------------------------------
 # TODO [√] 运行日志设置
 # ---------------------------------------------------
@@ -47,6 +68,13 @@ for _pending in [
     PROJECT_DATABASE,
     DIR_OUTPUT_STORE_COLLECTOR,
     DIR_OUTPUT_STORE_CLASSIFIER,
+    DIR_CHECKPOINT,
+    DIR_COOKIES,
+    DIR_HTTP_CACHE,
+    DIR_DNS_CACHE,
+    DIR_HOST_STATUS,
+    DIR_DATASET_MIRROR,
+    DIR_HOST_CATALOG,
     DIR_LOG
 ]:
     if not exists(_pending):
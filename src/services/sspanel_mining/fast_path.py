@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/4 15:20
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 注册页快速分析
+import html as _html
+import re
+from bisect import bisect_right
+from typing import Optional, Set, Sequence
+
+from bs4 import BeautifulSoup
+
+from .rules import RuleSet, REGISTER_RULES, SOURCE_TEXT
+
+# 注释与 script/style 的内容不会被 html.parser 解析为标签
+_INVISIBLE = re.compile(r"<!--.*?-->|<(script|style)\b[^>]*>.*?</\1[^>]*>", re.S | re.I)
+# 剥离标签与注释，得到页面文本的近似（保留 script/style 内容，结果只会偏多）
+_MARKUP = re.compile(r"<!--.*?-->|<[^>]*>", re.S)
+_DIV_OPEN = re.compile(r"<div\b[^<>]*>", re.I)
+_DIV_CLOSE = re.compile(r"</div\s*>", re.I)
+_CLASS_ATTR = re.compile(r"""(?<![\w:-])(?i:class)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+))""")
+
+
+class Page:
+    """
+    页面事实提取
+
+    分类规则只关心少量事实：id="passwd" / id="email_verify" 是否存在、是否存在 <select>、
+    simple-footer 的文本以及关键词命中情况。快速路径以预编译正则直接在原始文本上作答，
+    仅当无法确定时才构建完整的 BeautifulSoup，两条路径的结论保持一致。
+    """
+
+    def __init__(self, html: str, rules: RuleSet = REGISTER_RULES, fast: bool = True):
+        """
+
+        :param html: 原始响应文本
+        :param rules: 关键词规则
+        :param fast: False 时所有事实均由 soup 给出，用于对照验证
+        """
+        self.html = html or ""
+        self.rules = rules
+        self.fast = fast
+
+        self._soup: Optional[BeautifulSoup] = None
+        self._visible: Optional[str] = None
+        self._hidden: Optional[list] = None
+        self._labels: Optional[Set[str]] = None
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.html, "html.parser")
+        return self._soup
+
+    @property
+    def fallback(self) -> bool:
+        """是否退回了完整解析"""
+        return self._soup is not None
+
+    @property
+    def visible(self) -> str:
+        """剔除注释与 script/style 内容后的文本，标签只可能出现在这里"""
+        if self._visible is None:
+            self._visible = _INVISIBLE.sub("", self.html)
+        return self._visible
+
+    def _is_hidden(self, pos: int) -> bool:
+        """pos 是否落在注释或 script/style 内容中"""
+        if self._hidden is None:
+            self._hidden = [m.span() for m in _INVISIBLE.finditer(self.html)]
+        index = bisect_right(self._hidden, (pos, float("inf"))) - 1
+        return index >= 0 and self._hidden[index][0] <= pos < self._hidden[index][1]
+
+    def has_id(self, id_: str) -> bool:
+        """
+        等价于 soup.find(id=id_) is not None
+
+        :param id_:
+        :return:
+        """
+        if self.fast:
+            if id_ not in self.visible:
+                return False
+            value = re.escape(id_)
+            pattern = rf"""<[a-zA-Z][^<>]*?(?<![\w:-])(?i:id)\s*=\s*(?:"{value}"|'{value}'|{value}(?=[\s/>]))"""
+            if re.search(pattern, self.visible):
+                return True
+        return self.soup.find(id=id_) is not None
+
+    def has_tag(self, name: str) -> bool:
+        """
+        等价于 soup.find(name) is not None
+
+        :param name:
+        :return:
+        """
+        if self.fast:
+            return re.search(rf"<{re.escape(name)}(?=[\s/>])", self.visible, re.I) is not None
+        return self.soup.find(name) is not None
+
+    def footer(self) -> Optional[str]:
+        """
+        等价于 soup.find("div", class_="simple-footer").text，不存在时返回 None
+
+        :return:
+        """
+        if self.fast:
+            if "simple-footer" not in self.visible:
+                return None
+            for tag in _DIV_OPEN.finditer(self.html):
+                if self._is_hidden(tag.start()):
+                    continue
+                attr = _CLASS_ATTR.search(tag.group())
+                if not attr or "simple-footer" not in (attr.group(1) or attr.group(2) or attr.group(3) or "").split():
+                    continue
+                end = _DIV_CLOSE.search(self.html, tag.end())
+                if end is None:
+                    break
+                inner = self.html[tag.end():end.start()]
+                # 嵌套 div、注释与脚本交由完整解析
+                if re.search(r"<div\b|<!--|<script\b|<style\b", inner, re.I):
+                    break
+                return _html.unescape(_MARKUP.sub("", inner))
+        footer = self.soup.find("div", class_="simple-footer")
+        return footer.text if footer is not None else None
+
+    def labels(self) -> Set[str]:
+        """
+        关键词规则命中的标签
+
+        html 规则直接作用于原始文本；text 规则先在剥离标签后的近似文本上预检，
+        近似文本是页面文本的超集，未命中即可确定，命中时再以 soup.text 复核。
+        :return:
+        """
+        if self._labels is not None:
+            return self._labels
+        if not self.fast:
+            self._labels = self.rules.scan(html=self.html, soup=self.soup)
+            return self._labels
+
+        labels = self.rules.scan(html=self.html)
+        if SOURCE_TEXT in self.rules.sources:
+            approx = _MARKUP.sub("", self.html)
+            if "&" in approx:
+                approx = _html.unescape(approx)
+            candidates = self.rules.scan(text=approx)
+            if candidates:
+                labels |= self.rules.scan(text=self.soup.text)
+        self._labels = labels
+        return labels
+
+    def digest(self, ids: Sequence[str] = ("passwd", "email_verify"), tags: Sequence[str] = ("select",)) -> dict:
+        """
+        事实摘要，供响应缓存存储
+
+        :param ids: 需要记录的 id
+        :param tags: 需要记录的标签名
+        :return:
+        """
+        return {
+            "ids": [id_ for id_ in ids if self.has_id(id_)],
+            "tags": [name for name in tags if self.has_tag(name)],
+            "labels": sorted(self.labels()),
+            "rules": self.rules.fingerprint,
+        }
+
+
+class CachedPage:
+    """
+    由事实摘要还原的页面，提供分类器所需的 Page 接口，未记录的事实一律视为不存在
+    """
+
+    fallback = False
+
+    def __init__(self, facts: dict):
+        self.facts = facts
+
+    def has_id(self, id_: str) -> bool:
+        return id_ in self.facts.get("ids", [])
+
+    def has_tag(self, name: str) -> bool:
+        return name in self.facts.get("tags", [])
+
+    def labels(self) -> Set[str]:
+        return set(self.facts.get("labels", []))
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/8 16:12
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 站点名录
+import json
+import mmap
+import os
+import re
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from typing import Optional, Dict, Iterable, Iterator, List, Tuple
+
+# 数据集文件名中的采集日期，如 dataset_2022-02-07.txt
+_DATE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+
+class HostCatalog:
+    """
+    站点名录
+
+    将 Collector 历次输出的数据集合并为一份按链接排序、去重的名录，并记录每个站点首次与最近一次被采集的日期：
+        catalog.tsv  每行 url \\t first_seen \\t last_seen
+        catalog.idx  稀疏索引，每 stride 行记录一次链接及其字节偏移
+        catalog.json 已并入的数据集文件（大小与修改时间）及条目数
+    新数据集以归并方式并入，已并入且未变更的文件不再读取；查询某站点是否已收录时，
+    先在稀疏索引上二分定位，再在内存映射的数据文件中扫描一个索引块。
+    """
+
+    def __init__(self, dir_catalog: str, stride: Optional[int] = 256):
+        """
+
+        :param dir_catalog: 名录目录
+        :param stride: 稀疏索引的间隔行数
+        """
+        self.dir_catalog = dir_catalog
+        self.stride = stride
+
+        self.path_data = os.path.join(dir_catalog, "catalog.tsv")
+        self.path_index = os.path.join(dir_catalog, "catalog.idx")
+        self.path_meta = os.path.join(dir_catalog, "catalog.json")
+
+        self._meta = {"count": 0, "files": {}}
+        self._keys: Optional[List[str]] = None
+        self._offsets: Optional[List[int]] = None
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+
+        os.makedirs(dir_catalog, exist_ok=True)
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path_meta):
+            return
+        try:
+            with open(self.path_meta, "r", encoding="utf8") as f:
+                self._meta.update(json.load(f))
+        except (OSError, ValueError):
+            return
+
+    def save(self):
+        path_tmp = f"{self.path_meta}.tmp"
+        with open(path_tmp, "w", encoding="utf8") as f:
+            json.dump(self._meta, f)
+        os.replace(path_tmp, self.path_meta)
+
+    def __len__(self):
+        return self._meta["count"]
+
+    def __contains__(self, url: str) -> bool:
+        return self.get(url) is not None
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._keys = self._offsets = None
+
+    def _rows(self) -> Iterator[Tuple[str, str, str]]:
+        if not os.path.exists(self.path_data):
+            return
+        with open(self.path_data, "r", encoding="utf8", newline="\n") as f:
+            for line in f:
+                url, first_seen, last_seen = line.rstrip("\n").split("\t")
+                yield url, first_seen, last_seen
+
+    def ingest(self, paths: Iterable[str]) -> int:
+        """
+        并入数据集文件，跳过已并入且未变更的文件
+
+        :param paths: 数据集路径，采集日期取自文件名，缺省取文件修改日期
+        :return: 新收录的站点数
+        """
+        entries: Dict[str, List[str]] = {}
+        files = {}
+        for path in paths:
+            stat = os.stat(path)
+            name, signature = os.path.basename(path), [stat.st_size, stat.st_mtime_ns]
+            if self._meta["files"].get(name) == signature:
+                continue
+            files[name] = signature
+            matched = _DATE.search(name)
+            day = matched.group(1) if matched else datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d")
+            with open(path, "r", encoding="utf8", errors="ignore") as f:
+                for line in f:
+                    url = line.strip()
+                    if not url or "\t" in url:
+                        continue
+                    seen = entries.get(url)
+                    if seen is None:
+                        entries[url] = [day, day]
+                    else:
+                        seen[0], seen[1] = min(seen[0], day), max(seen[1], day)
+        if not files:
+            return 0
+        added = self.merge(entries)
+        self._meta["files"].update(files)
+        self.save()
+        return added
+
+    def merge(self, entries: Dict[str, List[str]]) -> int:
+        """
+        以归并方式写入站点，已收录的站点合并首次与最近采集日期
+
+        :param entries: {url: [first_seen, last_seen]}
+        :return: 新收录的站点数
+        """
+        pending = sorted(entries.items())
+        self.close()
+
+        path_tmp, index = f"{self.path_data}.tmp", []
+        count = added = offset = 0
+        with open(path_tmp, "w", encoding="utf8", newline="\n") as f:
+
+            def _write(url: str, first_seen: str, last_seen: str):
+                nonlocal count, offset
+                if count % self.stride == 0:
+                    index.append(f"{url}\t{offset}\n")
+                line = f"{url}\t{first_seen}\t{last_seen}\n"
+                f.write(line)
+                offset += len(line.encode("utf8"))
+                count += 1
+
+            i = 0
+            for url, first_seen, last_seen in self._rows():
+                while i < len(pending) and pending[i][0] < url:
+                    _write(pending[i][0], *pending[i][1])
+                    added, i = added + 1, i + 1
+                if i < len(pending) and pending[i][0] == url:
+                    first_seen, last_seen = min(first_seen, pending[i][1][0]), max(last_seen, pending[i][1][1])
+                    i += 1
+                _write(url, first_seen, last_seen)
+            for url, (first_seen, last_seen) in pending[i:]:
+                _write(url, first_seen, last_seen)
+                added += 1
+
+        # 索引首行记录数据文件大小，二者不一致时（如写入中断）重建索引
+        with open(f"{self.path_index}.tmp", "w", encoding="utf8", newline="\n") as f:
+            f.write(f"{offset}\n")
+            f.writelines(index)
+        os.replace(path_tmp, self.path_data)
+        os.replace(f"{self.path_index}.tmp", self.path_index)
+        self._meta["count"] = count
+        self.save()
+        return added
+
+    def _load_index(self):
+        size = os.path.getsize(self.path_data)
+        keys, offsets = [], []
+        try:
+            with open(self.path_index, "r", encoding="utf8", newline="\n") as f:
+                if int(f.readline()) == size:
+                    for line in f:
+                        key, offset = line.rstrip("\n").split("\t")
+                        keys.append(key)
+                        offsets.append(int(offset))
+                    self._keys, self._offsets = keys, offsets
+                    return
+        except (OSError, ValueError):
+            pass
+        # 索引缺失或过期，扫描数据文件重建
+        keys, offsets, offset = [], [], 0
+        with open(self.path_data, "rb") as f:
+            for n, line in enumerate(f):
+                if n % self.stride == 0:
+                    keys.append(line.split(b"\t", 1)[0].decode("utf8"))
+                    offsets.append(offset)
+                offset += len(line)
+        self._keys, self._offsets = keys, offsets
+
+    def get(self, url: str) -> Optional[Tuple[str, str]]:
+        """
+        查询站点
+
+        :param url:
+        :return: (first_seen, last_seen)，未收录时返回 None
+        """
+        if self._mm is None:
+            if not os.path.exists(self.path_data) or not os.path.getsize(self.path_data):
+                return None
+            self._load_index()
+            self._file = open(self.path_data, "rb")
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        block = bisect_right(self._keys, url) - 1
+        if block < 0:
+            return None
+        start = self._offsets[block]
+        end = self._offsets[block + 1] if block + 1 < len(self._offsets) else len(self._mm)
+        # 索引块以整行起始，块内以“换行 + 链接 + 制表符”定位
+        prefix = url.encode("utf8") + b"\t"
+        if self._mm[start:start + len(prefix)] == prefix:
+            pos = start + len(prefix)
+        else:
+            pos = self._mm.find(b"\n" + prefix, start, end)
+            if pos < 0:
+                return None
+            pos += len(prefix) + 1
+        first_seen, last_seen = self._mm[pos:self._mm.find(b"\n", pos)].decode("utf8").split("\t")
+        return first_seen, last_seen
+
+    def iter_hosts(
+            self,
+            days: Optional[int] = None,
+            since: Optional[str] = None,
+            today: Optional[date] = None,
+    ) -> Iterator[str]:
+        """
+        惰性遍历已收录的站点
+
+        :param days: 仅返回最近 days 天内被采集过的站点
+        :param since: 仅返回 since（YYYY-MM-DD）及之后被采集过的站点，与 days 同时给出时取较晚者
+        :param today: days 的参照日期，缺省为本地当日
+        :return:
+        """
+        cutoffs = [since] if since else []
+        if days is not None:
+            cutoffs.append(((today or date.today()) - timedelta(days=days)).strftime("%Y-%m-%d"))
+        cutoff = max(cutoffs) if cutoffs else None
+        for url, _, last_seen in self._rows():
+            if cutoff is None or last_seen >= cutoff:
+                yield url
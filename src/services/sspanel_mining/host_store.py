@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/6 9:18
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 站点状态库
+import sqlite3
+import time
+from typing import Optional, Dict, Iterable, List
+
+from services.utils import canonicalize_url
+from .records import Record
+
+_HOUR = 3600
+_DAY = 24 * _HOUR
+
+# 各标签的复检间隔（秒），按前缀匹配，如“危险通信”覆盖“危险通信(HTTP)”
+LABEL_TTL = {
+    "危险通信": 30 * _DAY,
+    "未授权站点": 30 * _DAY,
+    "域名失效": 3 * _DAY,
+    "拒绝注册": 7 * _DAY,
+    "限制注册": 3 * _DAY,
+    "请求异常": 1 * _DAY,
+    "CloudflareDefenseV2": 1 * _DAY,
+    "Normal": 1 * _DAY,
+    "Google reCAPTCHA": 1 * _DAY,
+    "Email Validation": 1 * _DAY,
+    "GeeTest Validation": 1 * _DAY,
+}
+
+# 瞬时故障标签：复检间隔随连续失败次数翻倍
+FAILURE_LABELS = ("流量阻断", "代理异常", "响应超时", "超出时限", "端口不可达")
+
+
+class HostStatusStore:
+    """
+    站点状态库
+
+    记录每个站点最近一次的分类标签、检测时间与连续失败次数，
+    增量模式下据此只复检新站点与标签已过期的站点，并由此导出全量分类结果。
+    """
+
+    def __init__(
+            self,
+            path: str,
+            ttl: Optional[Dict[str, float]] = None,
+            default_ttl: Optional[float] = 1 * _DAY,
+            failure_ttl: Optional[float] = 6 * _HOUR,
+            failure_ttl_cap: Optional[float] = 7 * _DAY,
+    ):
+        """
+
+        :param path: SQLite 数据库文件路径
+        :param ttl: 覆盖 LABEL_TTL 中的复检间隔
+        :param default_ttl: 未登记标签的复检间隔
+        :param failure_ttl: 瞬时故障标签首次失败后的复检间隔
+        :param failure_ttl_cap: 瞬时故障标签复检间隔的上限
+        """
+        self.path = path
+        self.ttl = {**LABEL_TTL, **(ttl or {})}
+        self.default_ttl = default_ttl
+        self.failure_ttl = failure_ttl
+        self.failure_ttl_cap = failure_ttl_cap
+
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS hosts ("
+            "url TEXT PRIMARY KEY, label TEXT NOT NULL, retries INTEGER NOT NULL DEFAULT 0, "
+            "checked_at REAL NOT NULL, failures INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM hosts").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def is_failure(label: str) -> bool:
+        return label.startswith(FAILURE_LABELS)
+
+    def ttl_of(self, label: str, failures: Optional[int] = 0) -> float:
+        """
+        标签的复检间隔，多标签（以 ; 分隔）取最短者
+
+        :param label:
+        :param failures: 连续失败次数
+        :return:
+        """
+        if self.is_failure(label):
+            return min(self.failure_ttl * 2 ** max(0, failures - 1), self.failure_ttl_cap)
+        ttl_ = []
+        for part in label.split(";"):
+            for prefix, seconds in self.ttl.items():
+                if part.startswith(prefix):
+                    ttl_.append(seconds)
+                    break
+            else:
+                ttl_.append(self.default_ttl)
+        return min(ttl_)
+
+    def get(self, url: str) -> Optional[dict]:
+        row = self.conn.execute(
+            "SELECT url, label, retries, checked_at, failures FROM hosts WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("url", "label", "retries", "checked_at", "failures"), row))
+
+    def record(self, records: Iterable[Record], when: Optional[float] = None) -> int:
+        """
+        写入分类结果，标签以文本形式入库
+
+        :param records: 分类器输出的 Record 或其落盘形式
+        :param when: 检测时间，缺省为当前时间
+        :return: 写入条数
+        """
+        when = time.time() if when is None else when
+        n = 0
+        with self.conn:
+            for record in records:
+                record = Record.load(record)
+                url, label = record.url, record.text()
+                if not url or not label:
+                    continue
+                # 连续失败计数：瞬时故障累加，其余标签清零
+                self.conn.execute(
+                    "INSERT INTO hosts (url, label, retries, checked_at, failures) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(url) DO UPDATE SET label = excluded.label, retries = excluded.retries, "
+                    "checked_at = excluded.checked_at, "
+                    "failures = CASE WHEN excluded.failures = 0 THEN 0 ELSE hosts.failures + 1 END",
+                    (url, label, record.retries, when, int(self.is_failure(label)))
+                )
+                n += 1
+        return n
+
+    def due(self, urls: Iterable[str], now: Optional[float] = None) -> List[str]:
+        """
+        筛选需要检测的站点：新站点，以及标签复检间隔已到期的站点
+
+        :param urls: 待分类链接，按规范化形式比对
+        :param now:
+        :return: 保持输入顺序
+        """
+        now = time.time() if now is None else now
+        pending = []
+        for url in urls:
+            status = self.get(canonicalize_url(url))
+            if status is None or now - status["checked_at"] >= self.ttl_of(status["label"], status["failures"]):
+                pending.append(url)
+        return pending
+
+    def export(self, urls: Optional[Iterable[str]] = None) -> List[dict]:
+        """
+        导出分类结果
+
+        :param urls: 仅导出这些站点，缺省导出全部
+        :return: [{"url", "label", "retries"}, ...]
+        """
+        if urls is None:
+            rows = self.conn.execute("SELECT url, label, retries FROM hosts").fetchall()
+        else:
+            rows = [self.get(u) for u in {canonicalize_url(u) for u in urls}]
+            rows = [(r["url"], r["label"], r["retries"]) for r in rows if r]
+        return [{"url": r[0], "label": r[1], "retries": r[2]} for r in rows]
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/7 21:40
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 分类结果记录
+import re
+import sys
+from enum import IntFlag
+from typing import Optional, Tuple
+
+
+class Label(IntFlag):
+    """站点标签，可按位组合；仅在导出时转换为文本"""
+
+    RECAPTCHA = 1 << 0
+    EMAIL_VALIDATION = 1 << 1
+    GEETEST = 1 << 2
+    NORMAL = 1 << 3
+    LIMIT_EMAIL = 1 << 4
+    LIMIT_INVITATION = 1 << 5
+    CLOSED = 1 << 6
+    DANGER_HTTP = 1 << 7
+    UNAUTHORIZED = 1 << 8
+    CLOUDFLARE = 1 << 9
+    REQUEST_ERROR = 1 << 10
+    BLOCKED = 1 << 11
+    PROXY_ERROR = 1 << 12
+    TIMEOUT = 1 << 13
+    DEADLINE = 1 << 14
+    NXDOMAIN = 1 << 15
+    UNREACHABLE = 1 << 16
+    # SSPanelStaffChecker
+    LOSS_STAFF = 1 << 17
+    LOSS_TOS = 1 << 18
+    ROOKIE = 1 << 19
+
+    def __str__(self):
+        return label_text(self)
+
+
+# 标签文本，按导出顺序排列；请求异常的文本携带状态码
+LABEL_TEXT = {
+    Label.RECAPTCHA: "Google reCAPTCHA",
+    Label.EMAIL_VALIDATION: "Email Validation",
+    Label.GEETEST: "GeeTest Validation",
+    Label.NORMAL: "Normal",
+    Label.LIMIT_EMAIL: "限制注册(邮箱)",
+    Label.LIMIT_INVITATION: "限制注册(邀请)",
+    Label.CLOSED: "拒绝注册",
+    Label.DANGER_HTTP: "危险通信(HTTP)",
+    Label.UNAUTHORIZED: "未授权站点",
+    Label.CLOUDFLARE: "CloudflareDefenseV2",
+    Label.REQUEST_ERROR: "请求异常",
+    Label.BLOCKED: "流量阻断",
+    Label.PROXY_ERROR: "代理异常",
+    Label.TIMEOUT: "响应超时",
+    Label.DEADLINE: "超出时限",
+    Label.NXDOMAIN: "域名失效",
+    Label.UNREACHABLE: "端口不可达",
+    Label.LOSS_STAFF: "loss_staff",
+    Label.LOSS_TOS: "loss_tos",
+    Label.ROOKIE: "rookie",
+}
+_TEXT_LABEL = {text: label for label, text in LABEL_TEXT.items()}
+_REQUEST_ERROR = re.compile(r"^请求异常\(ERROR:(\d+)\)$")
+
+
+def label_text(label: int, status: Optional[int] = None) -> str:
+    """
+    标签转文本，多个标签以 ; 分隔
+
+    :param label: Label 或其按位组合
+    :param status: 状态码，用于“请求异常(ERROR:<status>)”
+    :return:
+    """
+    parts = []
+    for flag, text in LABEL_TEXT.items():
+        if label & flag:
+            if flag is Label.REQUEST_ERROR and status is not None:
+                text = f"请求异常(ERROR:{status})"
+            parts.append(text)
+    return ";".join(parts)
+
+
+def parse_label(text: str) -> Tuple[Label, Optional[int]]:
+    """
+    文本转标签，用于读回旧格式的结果；无法识别的部分被忽略
+
+    :param text: 如 "Google reCAPTCHA;Email Validation"、"请求异常(ERROR:403)"
+    :return: (标签, 状态码)
+    """
+    label, status = Label(0), None
+    for part in (text or "").split(";"):
+        matched = _REQUEST_ERROR.match(part)
+        if matched:
+            label, status = label | Label.REQUEST_ERROR, int(matched.group(1))
+        elif part in _TEXT_LABEL:
+            label |= _TEXT_LABEL[part]
+    return label, status
+
+
+class Record:
+    """
+    单个站点的分类结果
+
+    链接驻留（intern）以便与任务队列、检查点中的同一字符串共享内存；标签以整数位图存储。
+    落盘时以 pack() 输出短键 JSON，导出时再以 to_dict() 转换为文本标签。
+    """
+
+    __slots__ = ("url", "label", "status", "retries", "elapsed", "n_bytes")
+
+    def __init__(
+            self,
+            url: str,
+            label: int,
+            status: Optional[int] = None,
+            retries: Optional[int] = 0,
+            elapsed: Optional[float] = None,
+            n_bytes: Optional[int] = 0,
+    ):
+        """
+
+        :param url: 站点链接
+        :param label: Label 或其按位组合
+        :param status: 最后一次响应的状态码
+        :param retries: 重试次数
+        :param elapsed: 请求耗时合计（秒）
+        :param n_bytes: 下载字节数合计
+        """
+        self.url = sys.intern(url)
+        self.label = Label(label)
+        self.status = status
+        self.retries = retries or 0
+        self.elapsed = elapsed
+        self.n_bytes = n_bytes or 0
+
+    def __repr__(self):
+        return f"Record(url={self.url!r}, label={self.text()!r}, status={self.status}, retries={self.retries})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Record):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+
+    def text(self) -> str:
+        return label_text(self.label, self.status)
+
+    def to_dict(self) -> dict:
+        """导出格式：{"url", "label", "retries"}"""
+        return {"url": self.url, "label": self.text(), "retries": self.retries}
+
+    def pack(self) -> dict:
+        """落盘格式，省略缺省值"""
+        packed = {"u": self.url, "l": int(self.label)}
+        if self.status is not None:
+            packed["s"] = self.status
+        if self.retries:
+            packed["r"] = self.retries
+        if self.elapsed is not None:
+            packed["t"] = round(self.elapsed, 3)
+        if self.n_bytes:
+            packed["b"] = self.n_bytes
+        return packed
+
+    @classmethod
+    def load(cls, packed) -> "Record":
+        """
+        读回 pack() 的输出，兼容旧版本落盘的 {"url", "label", "retries"}
+
+        :param packed:
+        :return:
+        """
+        if isinstance(packed, Record):
+            return packed
+        if "u" in packed:
+            return cls(packed["u"], packed["l"], packed.get("s"), packed.get("r"), packed.get("t"), packed.get("b"))
+        label, status = parse_label(packed.get("label"))
+        return cls(packed["url"], label, status=status, retries=int(packed.get("retries") or 0))
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/4 9:06
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 分类规则表
+import hashlib
+import re
+from typing import NamedTuple, Tuple, Optional, Set, Dict, List
+
+# 文档来源：原始响应文本 / 页面可见文本（soup.text）
+SOURCE_HTML = "html"
+SOURCE_TEXT = "text"
+
+
+class Rule(NamedTuple):
+    """
+    关键词规则：任一 pattern 出现在 source 中即命中 label
+    """
+    label: str
+    patterns: Tuple[str, ...]
+    source: str = SOURCE_HTML
+    ignore_case: bool = False
+
+
+class RuleSet:
+    """
+    规则引擎
+
+    同一来源的全部规则编译为一个多模式正则，每篇文档只扫描一遍即返回全部命中的标签。
+    新增规则只会扩充正则的分支，不会新增一次全文扫描。
+    """
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        self._compiled: Dict[str, Tuple[re.Pattern, Dict[str, str], int]] = {}
+
+        # 规则表指纹，规则增删改后随之变化，用于判定缓存的命中标签是否过期
+        self.fingerprint = hashlib.blake2b(repr(rules).encode("utf8"), digest_size=8).hexdigest()
+
+        for source in {rule.source for rule in rules}:
+            branches, names = [], {}
+            for index, rule in enumerate(r for r in rules if r.source == source):
+                group = f"r{index}"
+                names[group] = rule.label
+                alternation = "|".join(re.escape(p) for p in rule.patterns)
+                branches.append(f"(?P<{group}>{'(?i:' + alternation + ')' if rule.ignore_case else alternation})")
+            # 零宽前瞻：各位置独立尝试匹配，命中某条规则不会吞掉与之重叠的其他规则
+            pattern = re.compile("(?=" + "|".join(branches) + ")")
+            self._compiled[source] = (pattern, names, len(set(names.values())))
+
+    @property
+    def sources(self) -> Set[str]:
+        return set(self._compiled)
+
+    def scan(self, html: Optional[str] = None, soup=None, text: Optional[str] = None) -> Set[str]:
+        """
+        扫描文档
+
+        :param html: 原始响应文本
+        :param soup: BeautifulSoup 对象，仅在存在 text 规则时读取一次 soup.text
+        :param text: 页面可见文本，缺省时由 soup 生成
+        :return: 命中的标签集合
+        """
+        labels = set()
+        for source, (pattern, names, n_labels) in self._compiled.items():
+            if source == SOURCE_TEXT:
+                document = text if text is not None else (soup.text if soup is not None else None)
+            else:
+                document = html
+            if not document:
+                continue
+            found = set()
+            for match in pattern.finditer(document):
+                found.add(names[match.lastgroup])
+                # 全部标签均已命中，提前结束扫描
+                if len(found) == n_labels:
+                    break
+            labels |= found
+        return labels
+
+
+# ---------------------------------------------------
+# 注册页规则
+# ---------------------------------------------------
+LABEL_CLOSED = "拒绝注册"
+LABEL_INVITATION = "限制注册(邀请)"
+LABEL_RECAPTCHA = "Google reCAPTCHA"
+LABEL_GEETEST = "GeeTest Validation"
+
+REGISTER_RULES = RuleSet([
+    Rule(LABEL_CLOSED, ("closed",), source=SOURCE_TEXT),
+    Rule(LABEL_INVITATION, ("Please fill in invitation code", "请填写邀请码", "邀请码（必填）", "邀请码(必填)")),
+    Rule(LABEL_RECAPTCHA, ("grecaptcha.get",)),
+    Rule(LABEL_GEETEST, ("geetest",)),
+])
+
+# ---------------------------------------------------
+# 主页规则
+# ---------------------------------------------------
+LABEL_ROOKIE = "rookie"
+
+ROOKIE_RULES = RuleSet([
+    # 有趣的模版，有趣的灵魂
+    Rule(LABEL_ROOKIE, ("占位符", "。素质三连", "CXK"), source=SOURCE_TEXT),
+])
@@ -15,13 +15,16 @@ from requests.exceptions import (
     ProxyError,
 )
 
-from services.settings import logger
+from services.utils import CoroutineSpeedup
+from .fast_path import Page
+from .records import Label, Record, label_text
+from .rules import ROOKIE_RULES, LABEL_ROOKIE
 from .sspanel_classifier import SSPanelHostsClassifier
 
 
 class SSPanelStaffChecker(SSPanelHostsClassifier):
-    def __init__(self, docker: Optional[List[Any]] = None, debug: Optional[bool] = True):
-        super(SSPanelStaffChecker, self).__init__(docker=docker)
+    def __init__(self, docker: Optional[List[Any]] = None, debug: Optional[bool] = True, **kwargs):
+        super(SSPanelStaffChecker, self).__init__(docker=docker, **kwargs)
 
         self.path_register = "/auth/register"
         self.path_tos = "/tos"
@@ -41,41 +44,44 @@ class SSPanelStaffChecker(SSPanelHostsClassifier):
         }
 
     def _fall_staff_page(self, staff_url: str) -> None:
-        response, status_code, soup = self.handle_html(staff_url)
+        status_code = self.fetch(staff_url, read=False).status_code
 
         _loss_staff = True if status_code != 200 else False
 
         if _loss_staff and self.debug:
-            logger.info(self.report(
+            self.report(
                 message="STAFF",
                 url=staff_url,
-                status_code=status_code
-            ))
-        self._protocol_hook(staff_url, "loss_staff", _loss_staff)
+                status_code=status_code,
+                level="INFO",
+            )
+        self._protocol_hook(staff_url, Label.LOSS_STAFF, _loss_staff)
 
     def _fall_tos_page(self, tos_url: str) -> None:
-        response, status_code, soup = self.handle_html(tos_url)
+        status_code = self.fetch(tos_url, read=False).status_code
 
         _loss_tos = True if status_code != 200 else False
 
         if _loss_tos and self.debug:
-            logger.warning(self.report(
+            self.report(
                 message="TOS",
                 url=tos_url,
-                status_code=status_code
-            ))
+                status_code=status_code,
+                level="WARNING",
+            )
 
-        self._protocol_hook(tos_url, "loss_tos", _loss_tos)
+        self._protocol_hook(tos_url, Label.LOSS_TOS, _loss_tos)
 
     def _fall_staff_footer(self, register_url: str) -> None:
 
         context = {}
 
-        response, status_code, soup = self.handle_html(register_url, allow_redirects=True)
+        response = self.fetch(register_url, allow_redirects=True, markers=self.stop_markers)
+        page = Page(response.text, fast=self.fast_path)
 
-        copyright_ = soup.find("div", class_="simple-footer")
+        copyright_ = page.footer()
         try:
-            copyright_text = copyright_.text.strip()
+            copyright_text = copyright_.strip()
             context.update({"url": register_url, "copyright": copyright_text, "ok": True})
         except AttributeError:
             pass
@@ -84,77 +90,82 @@ class SSPanelStaffChecker(SSPanelHostsClassifier):
 
         # 转发上下文评价数据
         if context.get("ok"):
-            logger.success(self.report(
+            self.report(
                 message="实例正常",
                 url=context["url"],
-                copyright=context["copyright"]
-            ))
+                copyright=context["copyright"],
+                level="SUCCESS",
+            )
         else:
-            logger.error(self.report(
+            self.report(
                 message="脚注异常",
                 url=context["url"],
-            ))
+                level="ERROR",
+            )
 
     def _fall_rookie(self, url: str) -> None:
-        response, status_code, soup = self.handle_html(url)
+        response = self.fetch(url)
+        page = Page(response.text, rules=ROOKIE_RULES, fast=self.fast_path)
 
         # 有趣的模版，有趣的灵魂
-        _is_rookie = True if (
-                "占位符" in soup.text
-                or "。素质三连" in soup.text
-                or "CXK" in soup.text
-        ) else False
+        _is_rookie = LABEL_ROOKIE in page.labels()
 
         # 打印日志
         if _is_rookie and self.debug:
-            logger.warning(self.report(
+            self.report(
                 message="新手司机",
                 url=url,
-                rookie=True
-            ))
+                rookie=True,
+                level="WARNING",
+            )
 
         # 缓存上下文数据
-        self._protocol_hook(url, "rookie", _is_rookie)
+        self._protocol_hook(url, Label.ROOKIE, _is_rookie)
 
-    def _protocol_hook(self, url: str, cache_key: str, cache_value: bool) -> None:
+    def on_deadline(self, url: str):
+        # 跳过父类的标注逻辑，结果按 netloc 聚合
+        CoroutineSpeedup.on_deadline(self, url)
+        self.report("超出时限", url=url, level="ERROR")
+        self._protocol_hook(url, Label.DEADLINE, True)
+
+    def _protocol_hook(self, url: str, flag: Label, value: bool) -> None:
         """
 
         :param url:
-        :param cache_key: within [rookie loss-statement loss-staff loss tos]
-        :param cache_value:
+        :param flag: within [ROOKIE LOSS_STAFF LOSS_TOS DEADLINE]
+        :param value:
         :return:
         """
-        _hook = urlparse(url)
-        self.done.put_nowait({
-            f"{_hook.scheme}://{_hook.netloc}": {
-                cache_key: cache_value
-            },
-        })
+        status, elapsed, n_bytes = self._traces.pop(url, (None, None, 0))
+        self.emit(Record(url, flag if value else Label(0), status, elapsed=elapsed, n_bytes=n_bytes))
 
     def preload(self):
         """
         数据增强
 
-        在docker中拷贝一份子页链接用于广度搜素
+        在docker中拷贝一份子页链接用于广度搜素，以生成器的形式惰性展开
         :return:
         """
-        _docker = []
-
-        # 数据增强
-        for url in self.docker:
-            _parse_obj = urlparse(url)
-            _url = f"{_parse_obj.scheme}://{_parse_obj.netloc}"
-            # 添加审查 path
-            for suffix_ in [
-                self.path_register,
-                self.path_tos,
-                self.path_staff
-            ]:
-                _docker.append(_url + suffix_)
-            # 添加主页
-            _docker.append(_url)
+        docker = self.docker
+
+        def _augment():
+            for url in docker:
+                _parse_obj = urlparse(url)
+                _url = f"{_parse_obj.scheme}://{_parse_obj.netloc}"
+                # 添加审查 path
+                for suffix_ in [
+                    self.path_register,
+                    self.path_tos,
+                    self.path_staff
+                ]:
+                    yield _url + suffix_
+                # 添加主页
+                yield _url
+
         # 刷新数据容器缓存
-        self.docker = _docker
+        if self.total is None and hasattr(docker, "__len__"):
+            self.total = len(docker) * 4
+        self.docker = _augment()
 
     def control_driver(self, url: str):
         try:
@@ -168,48 +179,56 @@ class SSPanelStaffChecker(SSPanelHostsClassifier):
                 self._fall_rookie(url)
 
         # 站点被动行为，流量无法过墙
-        except ConnectionError:
-            logger.error(self.report("流量阻断", url=url))
+        except ConnectionError as e:
+            self.record_error(e)
+            if self.retry(url):
+                return False
+            self.report("流量阻断", url=url, level="ERROR")
             return False
         # 站点主动行为，拒绝国内IP访问
-        except (SSLError, HTTPError, ProxyError):
-            logger.error(self.report("代理异常", url=url))
+        except (SSLError, HTTPError, ProxyError) as e:
+            self.record_error(e)
+            if self.retry(url):
+                return False
+            self.report("代理异常", url=url, level="ERROR")
             return False
         # 未授权站点
         except ValueError:
-            logger.critical(self.report(
+            self.report(
                 message="危险通信",
-                context={"url": url, "label": "未授权站点"},
-                url=url
-            ))
+                label=Label.UNAUTHORIZED,
+                url=url,
+                level="CRITICAL",
+            )
             return False
         # <CloudflareDefense>被迫中断且无法跳过
         except CloudflareChallengeError:
-            logger.debug(self.report(
+            self.report(
                 message="检测失败",
-                context={"url": url, "label": "CloudflareDefenseV2"},
+                label=Label.CLOUDFLARE,
                 url=url,
-                error="<CloudflareDefense>被迫中断且无法跳过"
-            ))
+                error="<CloudflareDefense>被迫中断且无法跳过",
+                level="DEBUG",
+            )
             return False
         # 站点负载紊乱或主要服务器已瘫痪
-        except Timeout:
-            logger.error(self.report("响应超时", url=url))
+        except Timeout as e:
+            self.record_error(e)
+            if self.retry(url):
+                return False
+            self.report("响应超时", url=url, level="ERROR")
             return False
 
     def offload(self) -> list:
-        _output_docker = []
+        # 子页结果按 netloc 合并标签位图，导出时才转换为文本
         _cache_docker = {}
         while not self.done.empty():
-            context: dict = self.done.get()
-            for hook_netloc, cache_dict in context.items():
-                if not _cache_docker.get(hook_netloc):
-                    _cache_docker[hook_netloc] = cache_dict
-                else:
-                    _cache_docker[hook_netloc].update(cache_dict)
-        for hook_netloc, labels in _cache_docker.items():
-            _output_docker.append({
-                "url": hook_netloc,
-                "labels": ";".join([label[0] for label in labels.items() if label[-1]])
-            })
-        return _output_docker
+            # 检查点重放的结果为落盘形式
+            record = Record.load(self.done.get())
+            _hook = urlparse(record.url)
+            hook_netloc = f"{_hook.scheme}://{_hook.netloc}"
+            _cache_docker[hook_netloc] = _cache_docker.get(hook_netloc, Label(0)) | record.label
+        return [
+            {"url": hook_netloc, "labels": label_text(label)}
+            for hook_netloc, label in _cache_docker.items()
+        ]
@@ -1,7 +1,9 @@
+import time
 import urllib.request
+from typing import Optional
+from urllib.parse import urlparse, urlsplit
 
 from bs4 import BeautifulSoup
-from cloudscraper import create_scraper
 from cloudscraper.exceptions import CloudflareChallengeError
 from loguru import logger
 from requests import Response
@@ -13,12 +15,82 @@ from requests.exceptions import (
     ConnectionError,
 )
 
-from services.utils import CoroutineSpeedup
+from services.utils import (
+    CoroutineSpeedup,
+    ScraperPool,
+    ClearanceCookieStore,
+    DnsCache,
+    EventLog,
+    HttpCache,
+    LivenessProbe,
+    TimeoutPolicy,
+    canonicalize_url,
+    read_body,
+)
+from .fast_path import Page, CachedPage
+from .records import Label, Record
+from .rules import (
+    LABEL_CLOSED,
+    LABEL_INVITATION,
+    LABEL_RECAPTCHA,
+    LABEL_GEETEST,
+    REGISTER_RULES,
+)
 
 
 class SSPanelHostsClassifier(CoroutineSpeedup):
-    def __init__(self, docker: list = None):
-        super(SSPanelHostsClassifier, self).__init__(docker=docker)
+    def __init__(
+            self,
+            docker: list = None,
+            scraper_pool: Optional[int] = None,
+            cookie_store: Optional[ClearanceCookieStore] = None,
+            fast_path: bool = True,
+            max_body: Optional[int] = 2 * 1024 * 1024,
+            stop_markers: Optional[tuple] = ("</form>", "simple-footer"),
+            stop_grace: Optional[int] = 64 * 1024,
+            http_cache: Optional[HttpCache] = None,
+            resolver: Optional[DnsCache] = None,
+            prober: Optional[LivenessProbe] = None,
+            timeouts: Optional[TimeoutPolicy] = None,
+            log_level: Optional[str] = "DEBUG",
+            log_sample: Optional[float] = 1.0,
+            log_interval: Optional[float] = 30,
+            **kwargs
+    ):
+        # 入队时规范化链接并去重，同一站点一次运行只检测一次
+        kwargs.setdefault("canonicalize", canonicalize_url)
+        kwargs.setdefault("dedupe", True)
+        super(SSPanelHostsClassifier, self).__init__(docker=docker, **kwargs)
+
+        # 复用 cloudscraper 会话，缺省容量跟随运行功率
+        self.scraper_pool = scraper_pool
+        self.scrapers = ScraperPool(size=scraper_pool)
+
+        # Cloudflare 通行凭证缓存
+        self.cookie_store = cookie_store
+
+        # 以预编译规则直接分析原始文本，无法确定时才构建完整 DOM
+        self.fast_path = fast_path
+
+        # 流式下载响应体：超过 max_bytes 截断；注册表单与脚注均已出现后再读取 stop_grace 字节即停止
+        self.max_body = max_body
+        self.stop_markers = stop_markers
+        self.stop_grace = stop_grace
+
+        # 响应缓存：条件请求命中 304 时沿用上一次提取的页面事实
+        self.http_cache = http_cache
+
+        # 域名预解析：剔除不存在的域名，HTTP 阶段复用解析结果
+        self.resolver = resolver
+
+        # 端口存活探测：仅可达的站点进入完整检测
+        self.prober = prober
+
+        # 连接/读取超时，可依据本次运行的延迟分布自适应
+        self.timeouts = timeouts or TimeoutPolicy()
+
+        # 站点事件日志：逐条输出受级别与抽样控制，定期输出汇总行
+        self.events = EventLog(level=log_level, sample=log_sample, interval=log_interval, progress=self.progress)
         self.local_proxy = urllib.request.getproxies()
         logger.debug("本机代理状态 PROXY={}".format(self.local_proxy))
 
@@ -26,14 +98,8 @@ class SSPanelHostsClassifier(CoroutineSpeedup):
             "accept-language": "zh-CN",
         }
 
-        self.context = {
-            # 直连链接
-            "url": "",
-            # 样本标签
-            "label": "",
-            # 样本别名
-            "alias": "",
-        }
+        # 站点请求记录：url -> (状态码, 耗时, 字节数)，产出分类结果时取出
+        self._traces = {}
 
     def _fall_status(self, status_code: int, url: str):
         """
@@ -47,126 +113,246 @@ class SSPanelHostsClassifier(CoroutineSpeedup):
                 status_code > 400
                 or status_code == 302
         ):
-            logger.error(self.report(
+            self.report(
                 message="请求异常",
-                context={"url": url, "label": f"请求异常(ERROR:{status_code})"},
+                label=Label.REQUEST_ERROR,
                 url=url,
-            ))
+                status=status_code,
+                level="ERROR",
+            )
             return False
         return True
 
-    def _fall_register_closed(self, soup: BeautifulSoup, url: str):
+    def _load_page(self, url: str):
+        """
+        获取注册页并提取页面事实，优先使用响应缓存
+
+        :param url:
+        :return: Page / CachedPage；状态异常时返回 None
+        """
+        cache = self.http_cache
+        cached = cache.get(url) if cache is not None else None
+        # 摘要中的标签由旧版规则表得出，视为未命中，重新请求并分类
+        if cached and cached["facts"].get("rules") != REGISTER_RULES.fingerprint:
+            cached = None
+
+        # 信任期内的缓存条目，无需请求
+        if cache is not None and cache.fresh(cached):
+            cache.hits += 1
+            return CachedPage(cached["facts"])
+
+        response = self.fetch(url, markers=self.stop_markers, headers=HttpCache.validators(cached))
+
+        # 页面未变更，沿用缓存的事实摘要
+        if response.status_code == 304 and cached:
+            cache.revalidated += 1
+            cache.touch(url)
+            return CachedPage(cached["facts"])
+
+        # 状态异常的站点
+        if not self._fall_status(response.status_code, url):
+            return None
+
+        # 关键词规则单次扫描，DOM 事实按需惰性求值
+        page = Page(response.text, fast=self.fast_path)
+        if cache is not None:
+            cache.put(
+                url, page.digest(),
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified")
+            )
+        return page
+
+    def _fall_register_closed(self, page: Page, url: str):
         """
         规则：判断关闭注册接口或结构非范式的站点
 
-        :param soup:
+        :param page:
         :param url:
         :return:
         """
         if (
-                "closed" in soup.text
-                or not soup.find(id="passwd")
+                LABEL_CLOSED in page.labels()
+                or not page.has_id("passwd")
         ):
-            logger.warning(self.report(
+            self.report(
                 message="拒绝注册",
-                context={"url": url, "label": "拒绝注册"},
+                label=Label.CLOSED,
                 url=url,
-            ))
+                level="WARNING",
+            )
             return False
         return True
 
-    def _fall_register_limit_by_email(self, soup: BeautifulSoup, url: str):
+    def _fall_register_limit_by_email(self, page: Page, url: str):
         """
         规则：判断限定注册邮箱域名的站点
 
-        :param soup:
+        :param page:
         :param url:
         :return:
         """
-        if soup.find("select") and soup.find(id="email_verify"):
-            logger.info(self.report(
+        if page.has_tag("select") and page.has_id("email_verify"):
+            self.report(
                 message="限制注册",
-                context={"url": url, "label": "限制注册(邮箱)"},
+                label=Label.LIMIT_EMAIL,
                 url=url,
-            ))
+                level="INFO",
+            )
             return False
         return True
 
-    def _fall_register_limit_by_code(self, response: Response, url: str):
+    def _fall_register_limit_by_code(self, page: Page, url: str):
         """
         规则：判断需要邀请码注册的站点
 
         :return:
         """
-        if (
-                "Please fill in invitation code" in response.text
-                or "请填写邀请码" in response.text
-                or "邀请码（必填）" in response.text
-                or "邀请码(必填)" in response.text
-        ):
-            logger.info(self.report(
+        if LABEL_INVITATION in page.labels():
+            self.report(
                 message="限制注册",
-                context={"url": url, "label": "限制注册(邀请)"},
+                label=Label.LIMIT_INVITATION,
                 url=url,
-            ))
+                level="INFO",
+            )
             return False
         return True
 
-    def _fine_node(self, response: Response, soup: BeautifulSoup, url: str):
+    def _fine_node(self, page: Page, url: str):
         """
         标注正常站点
 
-        :param response:
-        :param soup:
+        :param page:
         :param url:
         :return:
         """
-        labels_ = []
-        if "grecaptcha.get" in response.text:
-            labels_.append("Google reCAPTCHA")
-        if soup.find(id="email_verify"):
-            labels_.append("Email Validation")
-        if "geetest" in response.text:
-            labels_.append("GeeTest Validation")
-        if not labels_:
-            labels_.append("Normal")
-        logger.success(self.report(
+        labels = page.labels()
+        label = Label(0)
+        if LABEL_RECAPTCHA in labels:
+            label |= Label.RECAPTCHA
+        if page.has_id("email_verify"):
+            label |= Label.EMAIL_VALIDATION
+        if LABEL_GEETEST in labels:
+            label |= Label.GEETEST
+        self.report(
             message="实例正常",
-            context={"url": url, "label": ";".join(labels_)},
+            label=label or Label.NORMAL,
             url=url,
-        ))
+            level="SUCCESS",
+        )
         return True
 
     def _fall_danger(self, url: str):
         if not url.startswith("https://"):
-            logger.warning(self.report(
+            self.report(
                 message="危险通信",
-                context={"url": url, "label": "危险通信(HTTP)"},
-                url=url
-            ))
+                label=Label.DANGER_HTTP,
+                url=url,
+                level="WARNING",
+            )
             return False
         return True
 
-    def report(self, message: str, context: dict = None, **flags) -> str:
+    def _fall_transient(self, url: str, label: Label):
         """
-        格式化运行日志，缓存上下文摘要信息
+        规则：处理超时、连接中断等瞬时故障
 
-        :param message:
-        :param context:
-        :param flags:
+        重试次数未耗尽时延后重新检测，耗尽后才写入最终标签
+        :param url:
+        :param label:
         :return:
         """
+        if self.retry(url):
+            self.report("稍后重试", url=url, error=label, retries=self.retries(url), level="DEBUG")
+            return False
+        self.report(
+            message=str(label),
+            label=label,
+            url=url,
+            level="ERROR",
+        )
+        return False
+
+    def report(self, message: str, label: Optional[Label] = None, level: str = "INFO", **flags):
+        """
+        记录站点事件，产出站点的分类结果
+
+        日志文本惰性格式化，是否逐条输出由 log_level 与 log_sample 决定。
+        :param message: 事件名
+        :param label: 站点标签，与 url 字段一并给出时产出一条 Record
+        :param level: 日志级别
+        :param flags: 结构化字段
+        :return:
+        """
+
+        # 产出分类结果，附带该站点各次请求的状态码、耗时与下载字节数
+        url = flags.get("url")
+        if label is not None and url:
+            status, elapsed, n_bytes = self._traces.pop(url, (None, None, 0))
+            self.emit(Record(url, label, status, self.retries(url), elapsed, n_bytes))
+            flags.setdefault("label", label)
+
+        self.events.log(level, message, **flags)
+
+    def on_deadline(self, url: str):
+        super(SSPanelHostsClassifier, self).on_deadline(url)
+        self.report(
+            message="超出时限",
+            label=Label.DEADLINE,
+            url=url,
+            level="ERROR",
+        )
+
+    def fetch(
+            self,
+            url: str,
+            allow_redirects: bool = False,
+            markers: Optional[tuple] = None,
+            read: bool = True,
+            headers: Optional[dict] = None,
+    ) -> Response:
+        """
+        获取页面，不做解析
 
-        # 缓存上下文数据流
-        if isinstance(context, dict):
-            if context.get("url") and context.get("label"):
-                self.done.put_nowait(context)
+        响应体以流式读取，受 max_body 限制，并在 markers 全部出现后提前结束；下载字节数按站点计入运行指标。
 
-        # 格式化运行日志
-        _content = f"{message} - [{self.progress()}] "
-        if flags:
-            _content += " ".join([f"{i[0]}={i[1]}" for i in flags.items()])
-        return _content
+        :param allow_redirects:
+        :param url:
+        :param markers: 决定性标记，缺省读取至响应结束或字节上限
+        :param read: False 时只取状态码与响应头，不下载响应体
+        :param headers: 附加请求头，如条件请求头
+        :return:
+        """
+        netloc = urlparse(url).netloc
+        start = time.time()
+        with self.scrapers.session(netloc) as scraper:
+            headers = {**self.headers, **headers} if headers else self.headers
+            # 复用 Cloudflare 通行凭证，须携带凭证绑定的 User-Agent
+            if self.cookie_store is not None:
+                user_agent = self.cookie_store.apply(scraper, netloc)
+                if user_agent:
+                    headers = {**headers, "User-Agent": user_agent}
+            response = scraper.get(
+                url, timeout=self.timeouts.timeout, allow_redirects=allow_redirects, headers=headers, stream=True
+            )
+            self.timeouts.observe(response.elapsed.total_seconds())
+            if self.cookie_store is not None:
+                self.cookie_store.harvest(scraper, netloc, headers.get("User-Agent") or scraper.headers["User-Agent"])
+            if read:
+                n_bytes, aborted = read_body(
+                    response, max_bytes=self.max_body, markers=markers, grace=self.stop_grace
+                )
+            else:
+                response.close()
+                n_bytes, aborted = 0, False
+        self.metrics.record_bytes(netloc, n_bytes, aborted)
+        self._trace(url, response.status_code, time.time() - start, n_bytes)
+        return response
+
+    def _trace(self, url: str, status: int, elapsed: float, n_bytes: int):
+        # 累计站点各次请求（含重试）的耗时与字节数，保留最后一次的状态码
+        _, elapsed_, n_bytes_ = self._traces.get(url) or (None, 0.0, 0)
+        self._traces[url] = (status, elapsed_ + elapsed, n_bytes_ + n_bytes)
 
     def handle_html(self, url: str, allow_redirects: bool = False):
         """
@@ -175,65 +361,185 @@ class SSPanelHostsClassifier(CoroutineSpeedup):
         :param url:
         :return:
         """
-        scraper = create_scraper()
-        response = scraper.get(url, timeout=60, allow_redirects=allow_redirects, headers=self.headers)
+        response = self.fetch(url, allow_redirects=allow_redirects)
         status_code = response.status_code
         soup = BeautifulSoup(response.text, "html.parser")
         return response, status_code, soup
 
+    def on_shard(self, shard: int):
+        self.events.reset()
+
+    def killer(self):
+        # 分片子进程的事件计数随运行指标回传，汇总行只由主进程输出
+        if self._is_shard:
+            self.metrics.events.update(self.events.counter)
+        else:
+            self.events.counter.update(self.metrics.events)
+            self.events.summary(final=True)
+        self.scrapers.close()
+        if self.http_cache is not None:
+            if not self._is_shard:
+                logger.info("响应缓存 - hits={} revalidated={}".format(
+                    self.http_cache.hits, self.http_cache.revalidated))
+            self.http_cache.close()
+        if self.cookie_store is not None:
+            self.cookie_store.save()
+
+    def preresolve(self, docker) -> list:
+        """
+        域名预解析
+
+        并发解析全部域名，不存在的域名直接标注为“域名失效”，不再进入 HTTP 阶段。
+        经本机代理出站时由代理解析域名，本机解析结果不能代表站点状态，跳过预解析。
+        :param docker:
+        :return: 仍需检测的链接
+        """
+        tasks, hosts = list(docker), {}
+        if self.local_proxy.get("https"):
+            logger.info("域名预解析 - 已配置本机代理，跳过")
+            return tasks
+
+        for task in tasks:
+            parts = urlsplit(canonicalize_url(task)) if isinstance(task, str) else None
+            # http 站点由 _fall_danger 直接标注为“危险通信”，无需解析
+            hosts[task] = parts.hostname if parts is not None and parts.scheme == "https" else None
+        nxdomain = self.resolver.resolve_all(host for host in hosts.values() if host)
+
+        pending, dropped = [], set()
+        for task in tasks:
+            if hosts[task] not in nxdomain:
+                pending.append(task)
+                continue
+            url = canonicalize_url(task)
+            if url in dropped:
+                continue
+            dropped.add(url)
+            self.report(
+                message="域名失效",
+                label=Label.NXDOMAIN,
+                url=url,
+                level="WARNING",
+            )
+        logger.info(f"域名预解析 - hosts={len(set(hosts.values()))} nxdomain={len(nxdomain)}")
+        return pending
+
+    def prefilter(self, docker) -> list:
+        """
+        端口存活探测
+
+        对 https 站点的端口发起短超时的 TCP 连接（可选 TLS 握手），不可达的站点标注为“端口不可达”。
+        经本机代理出站时直连结果不能代表站点状态，跳过探测。
+        :param docker:
+        :return: 仍需检测的链接
+        """
+        tasks = list(docker)
+        if self.local_proxy.get("https"):
+            logger.info("存活探测 - 已配置本机代理，跳过")
+            return tasks
+
+        addresses = {}
+        for task in tasks:
+            parts = urlsplit(canonicalize_url(task)) if isinstance(task, str) else None
+            # http 站点由 _fall_danger 直接剔除，无需探测
+            if parts is None or parts.scheme != "https" or not parts.hostname:
+                continue
+            try:
+                addresses[task] = (parts.hostname, parts.port or 443)
+            except ValueError:
+                continue
+        unreachable = self.prober.probe_all(addresses.values())
+
+        pending, dropped = [], set()
+        for task in tasks:
+            if addresses.get(task) not in unreachable:
+                pending.append(task)
+                continue
+            url = canonicalize_url(task)
+            if url in dropped:
+                continue
+            dropped.add(url)
+            self.report(
+                message="端口不可达",
+                label=Label.UNREACHABLE,
+                url=url,
+                level="ERROR",
+            )
+        logger.info(f"存活探测 - hosts={len(set(addresses.values()))} unreachable={len(unreachable)}")
+        return pending
+
+    def go(self, power: Optional[int] = None, *args, **kwargs):
+        if self.scraper_pool is None:
+            power = self.power if power is None else power
+            self.scrapers.size = max(power, self.max_power) if self.adaptive else power
+        # 预解析与存活探测只在主进程分片前运行一次，分片子进程继承解析缓存、已接管的 getaddrinfo 与筛选后的任务
+        if self.docker is None or self._is_shard or (self.resolver is None and self.prober is None):
+            return super(SSPanelHostsClassifier, self).go(power, *args, **kwargs)
+
+        if self.resolver is not None:
+            self.docker = self.preresolve(self.docker)
+            self.resolver.install()
+        try:
+            if self.prober is not None:
+                self.docker = self.prefilter(self.docker)
+            return super(SSPanelHostsClassifier, self).go(power, *args, **kwargs)
+        finally:
+            if self.resolver is not None:
+                self.resolver.uninstall()
+                self.resolver.save()
+
     @logger.catch()
     def control_driver(self, url: str):
         # 剔除 http 直连站点
         if not self._fall_danger(url):
             return False
         try:
-            response, status_code, soup = self.handle_html(url)
-
-            # 状态异常的站点
-            if not self._fall_status(status_code, url):
+            page = self._load_page(url)
+            if page is None:
                 return False
 
             # 关闭注册接口或结构非范式的站点
-            if not self._fall_register_closed(soup, url):
+            if not self._fall_register_closed(page, url):
                 return False
 
             # 需要邀请码注册的站点
-            if not self._fall_register_limit_by_code(response, url):
+            if not self._fall_register_limit_by_code(page, url):
                 return False
 
             # 限定注册邮箱域名的站点
-            if not self._fall_register_limit_by_email(soup, url):
+            if not self._fall_register_limit_by_email(page, url):
                 return False
 
             # 标注正常站点
-            return self._fine_node(response, soup, url)
+            return self._fine_node(page, url)
 
         # 站点被动行为，流量无法过墙
-        except ConnectionError:
-            logger.error(self.report("流量阻断", url=url))
-            return False
+        except ConnectionError as e:
+            self.record_error(e)
+            return self._fall_transient(url, Label.BLOCKED)
         # 站点主动行为，拒绝国内IP访问
-        except (SSLError, HTTPError, ProxyError):
-            logger.error(self.report("代理异常", url=url))
-            return False
+        except (SSLError, HTTPError, ProxyError) as e:
+            self.record_error(e)
+            return self._fall_transient(url, Label.PROXY_ERROR)
         # 未授权站点
         except ValueError:
-            logger.critical(self.report(
+            self.report(
                 message="危险通信",
-                context={"url": url, "label": "未授权站点"},
-                url=url
-            ))
+                label=Label.UNAUTHORIZED,
+                url=url,
+                level="CRITICAL",
+            )
             return False
         # <CloudflareDefense>被迫中断且无法跳过
         except CloudflareChallengeError:
-            logger.debug(self.report(
+            self.report(
                 message="检测失败",
-                context={"url": url, "label": "CloudflareDefenseV2"},
+                label=Label.CLOUDFLARE,
                 url=url,
-                error="<CloudflareDefense>被迫中断且无法跳过"
-            ))
+                error="<CloudflareDefense>被迫中断且无法跳过",
+                level="DEBUG",
+            )
             return False
         # 站点负载紊乱或主要服务器已瘫痪
-        except Timeout:
-            logger.error(self.report("响应超时", url=url))
-            return False
+        except Timeout as e:
+            self.record_error(e)
+            return self._fall_transient(url, Label.TIMEOUT)
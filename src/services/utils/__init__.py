@@ -3,7 +3,19 @@
 # Author     : QIN2DIM
 # Github     : https://github.com/QIN2DIM
 # Description:
+from .accelerator.checkpoint import Checkpoint
 from .accelerator.core import CoroutineSpeedup
+from .accelerator.dedup import canonicalize_url
+from .accelerator.sink import ResultSink, JsonlSink, CsvSink
+from .accelerator.timeout import TimeoutPolicy
+from .body_reader import read_body
+from .cookie_store import ClearanceCookieStore
+from .dataset_mirror import DatasetMirror
+from .dns_cache import DnsCache
+from .event_log import EventLog
+from .http_cache import HttpCache
+from .liveness import LivenessProbe
+from .scraper_pool import ScraperPool
 from .toolbox.toolbox import InitLog, get_ctx
 
-__all__ = ["CoroutineSpeedup", "InitLog", "get_ctx"]
+__all__ = ["CoroutineSpeedup", "Checkpoint", "canonicalize_url", "ScraperPool", "ClearanceCookieStore", "DatasetMirror", "DnsCache", "EventLog", "HttpCache", "LivenessProbe", "ResultSink", "JsonlSink", "CsvSink", "TimeoutPolicy", "read_body", "InitLog", "get_ctx"]
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/4 9:07
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 断点续传
+import glob
+import os
+from typing import Optional, List, Any, Tuple, Set
+
+from .sink import JsonlSink
+
+
+class Checkpoint(JsonlSink):
+    """
+    运行检查点
+
+    追加写入的 JSONL 文件，每行记录一个已了结的任务及其产出的结果：
+        {"k": <task>, "r": [<result>, ...]}
+    任务与其结果在同一行落盘，进程中断时不会出现“结果已写入但任务未完成”的半截状态。
+    多进程分片运行时，各工作进程写入 `<path>.<shard>`，读取时一并合并。
+    """
+
+    def __init__(self, path: str, batch_size: Optional[int] = 50, flush_interval: Optional[float] = 5):
+        super(Checkpoint, self).__init__(path=path, batch_size=batch_size, flush_interval=flush_interval)
+
+    def complete(self, task: Any, results: Optional[List[Any]] = None):
+        """
+        记录一个已了结的任务
+
+        :param task: 任务本身，须可 JSON 序列化
+        :param results: 该任务产出的结果
+        :return:
+        """
+        self.write({"k": task, "r": results or []})
+
+    def fork(self, shard: int) -> "Checkpoint":
+        return Checkpoint(f"{self.path}.{shard}", batch_size=self.batch_size, flush_interval=self.flush_interval)
+
+    def paths(self) -> List[str]:
+        return [p for p in [self.path] + sorted(glob.glob(f"{glob.escape(self.path)}.*")) if os.path.isfile(p)]
+
+    def restore(self) -> Tuple[Set[Any], List[Any]]:
+        """
+        读回检查点
+
+        :return: (已了结的任务集合, 已产出的结果列表)
+        """
+        completed, results = set(), []
+        for path in self.paths():
+            for record in JsonlSink(path).load():
+                if not isinstance(record, dict) or "k" not in record:
+                    continue
+                task = record["k"]
+                # JSON 数组读回为 list，转为 tuple 以便哈希
+                task = tuple(task) if isinstance(task, list) else task
+                if task in completed:
+                    continue
+                completed.add(task)
+                results.extend(record.get("r") or [])
+        return completed, results
+
+    def purge(self):
+        """
+        清除检查点文件
+
+        :return:
+        """
+        self.close()
+        for path in self.paths():
+            os.remove(path)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/4 9:07
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 协程并发度控制器
+from typing import Optional
+
+
+class AIMDController:
+    """
+    加性增、乘性减（AIMD）的并发度控制器
+
+    每个观测窗口结束时根据窗口内的吞吐量与异常率调整功率：
+        - 异常率超过阈值：功率按 backoff 系数收缩
+        - 吞吐量未出现明显回落：功率按 step 线性增长
+        - 吞吐量回落但无异常：视为已越过拐点，功率回退一个 step
+    """
+
+    def __init__(
+            self,
+            power: int,
+            min_power: Optional[int] = 2,
+            max_power: Optional[int] = 300,
+            step: Optional[int] = 8,
+            backoff: Optional[float] = 0.7,
+            error_threshold: Optional[float] = 0.2,
+    ):
+        self.min_power = max(1, min_power)
+        self.max_power = max(self.min_power, max_power)
+        self.power = min(max(power, self.min_power), self.max_power)
+        self.step = max(1, step)
+        self.backoff = backoff
+        self.error_threshold = error_threshold
+
+        # 当前窗口内完成的任务数与异常数
+        self.completed = 0
+        self.errors = 0
+
+        # 上一窗口的吞吐量
+        self.throughput = 0.0
+
+    def observe(self, ok: Optional[bool] = True):
+        """
+        记录一次任务结果
+
+        :param ok: False 表示任务以超时、连接失败等网络异常告终
+        :return:
+        """
+        if ok:
+            self.completed += 1
+        else:
+            self.errors += 1
+
+    def update(self, elapsed: float) -> int:
+        """
+        结束当前观测窗口并给出新的功率
+
+        :param elapsed: 窗口时长（秒）
+        :return:
+        """
+        completed, errors = self.completed, self.errors
+        self.completed = self.errors = 0
+
+        # 空窗口不提供任何信息，维持原状
+        if completed + errors == 0 or elapsed <= 0:
+            return self.power
+
+        throughput = completed / elapsed
+        if errors / (completed + errors) > self.error_threshold:
+            self.power = int(self.power * self.backoff)
+        elif throughput >= self.throughput * 0.9:
+            self.power += self.step
+        else:
+            self.power -= self.step
+        self.power = min(max(self.power, self.min_power), self.max_power)
+        self.throughput = throughput
+        return self.power
@@ -3,37 +3,190 @@
 # Author     : QIN2DIM
 # Github     : https://github.com/QIN2DIM
 # Description:
+import heapq
+import itertools
+import json
+import math
+import multiprocessing
 import os
-from typing import Optional, List, Any
+import queue
+import random
+import time
+import zlib
+from collections import deque
+from typing import Optional, List, Any, Callable, Hashable
+from urllib.parse import urlparse
 
 import gevent
+from gevent.event import Event
+from gevent.pool import Group
 from gevent.queue import Queue
+from loguru import logger
+
+from .checkpoint import Checkpoint
+from .controller import AIMDController
+from .dedup import SeenFilter
+from .metrics import RunMetrics
+
+# 任务流终止信号
+_SENTINEL = object()
+
+
+class DeadlineExceeded(Exception):
+    """任务超出单任务时限或整体运行时限"""
+
+
+def netloc_key(task: Any) -> Optional[Hashable]:
+    """
+    默认的主机键：取链接的 netloc，非链接任务不参与主机限流
+
+    :param task:
+    :return:
+    """
+    if isinstance(task, str):
+        return urlparse(task).netloc.lower() or None
+    return None
 
 
 class CoroutineSpeedup:
     """轻量化的协程控件"""
 
-    def __init__(self, docker: Optional[Any] = None, power: Optional[int] = None):
+    def __init__(
+            self,
+            docker: Optional[Any] = None,
+            power: Optional[int] = None,
+            total: Optional[int] = None,
+            queue_size: Optional[int] = None,
+            host_limit: Optional[int] = None,
+            host_key: Optional[Callable[[Any], Optional[Hashable]]] = None,
+            adaptive: Optional[bool] = False,
+            max_power: Optional[int] = 300,
+            interval: Optional[float] = 5,
+            sink: Optional[Any] = None,
+            workers: Optional[int] = 1,
+            task_timeout: Optional[float] = None,
+            budget: Optional[float] = None,
+            max_attempts: Optional[int] = 1,
+            backoff: Optional[float] = 2,
+            backoff_cap: Optional[float] = 60,
+            priority: Optional[Callable[[Any], Any]] = None,
+            metrics_path: Optional[str] = None,
+            checkpoint: Optional[Checkpoint] = None,
+            canonicalize: Optional[Callable[[Any], Any]] = None,
+            dedupe: Optional[bool] = False,
+            dedupe_capacity: Optional[int] = None,
+    ):
         # 任务容器：queue
         self.worker, self.done = Queue(), Queue()
 
-        # 任务容器
+        # 任务容器，可以是列表，也可以是任意迭代器/生成器
         self.docker = docker
 
         # 协程数
         self.power = max(os.cpu_count(), 2) if power is None else power
 
-        # 任务队列满载时刻长度
+        # 任务总数，docker 为迭代器时可手动指定，缺省时视为总数未知
+        self.total = total
+
+        # 任务队列容量上限，缺省为协程数的两倍
+        self.queue_size = queue_size
+
+        # 任务总数，None 表示总数未知
         self.max_queue_size = 0
 
+        # 已出队的任务数
+        self.taken = 0
+
+        # 惰性任务源
+        self._source = None
+
+        # 单主机并发上限，None 表示不限流
+        self.host_limit = host_limit
+
+        # 主机键函数，返回 None 的任务不参与限流
+        self.host_key = netloc_key if host_key is None else host_key
+
+        # 主机维度的在途任务数与积压任务
+        self._host_inflight = {}
+        self._host_parked = {}
+
+        # 自适应功率：依据吞吐量与网络异常率动态伸缩协程数
+        self.adaptive = adaptive
+        self.max_power = max_power
+        self.interval = interval
+        self.controller: Optional[AIMDController] = None
+
+        # 功率变化轨迹 [(运行时长, 功率), ...]
+        self.power_history = []
+
+        # 存活的协程数与任务流是否已枯竭
+        self._live = 0
+        self._exhausted = Event()
+        self._pool: Optional[Group] = None
+        self._feeder = None
+
+        # 当前任务上报过网络异常的协程
+        self._failed = set()
+
+        # 结果汇：ResultSink 实例或任意可调用对象，缺省时结果缓存于 done 队列
+        self.sink = sink
+
+        # 工作进程数，大于 1 时按主机键哈希分片，每个进程运行独立的 gevent hub
+        self.workers = workers or 1
+        self._is_shard = False
+
+        # 单任务时限与整体运行时限（秒），超时的任务由 on_deadline() 收尾
+        self.task_timeout = task_timeout
+        self.budget = budget
+        self._deadline: Optional[float] = None
+        self._expired = False
+
+        # 因整体运行时限到期而未执行的任务数
+        self.skipped = 0
+
+        # 运行指标，运行期间可通过 stats() 读取，结束时输出 JSON 摘要（可选落盘至 metrics_path）
+        self.metrics = RunMetrics()
+        self.metrics_path = metrics_path
+
+        # 检查点：记录已了结的任务及其结果，再次运行时跳过已完成的任务
+        self.checkpoint = checkpoint
+        self._completed = set()
+        self._emitted = {}
+
+        # 入队规范化与去重：同一规范化任务在一次运行中至多执行一次
+        # dedupe_capacity 为空时使用精确集合，否则使用该容量的布隆过滤器
+        self.canonicalize = canonicalize
+        self.dedupe = dedupe
+        self.dedupe_capacity = dedupe_capacity
+        self.duplicates = 0
+
+        # 失败重试：单任务最多执行 max_attempts 次，第 n 次重试前等待 backoff * 2^(n-1) 秒（带抖动）
+        self.max_attempts = max(1, max_attempts or 1)
+        self.backoff = backoff
+        self.backoff_cap = backoff_cap
+
+        # 延迟重试堆 [(到期时刻, 序号, 任务), ...] 与各任务已失败的次数
+        self._delayed = []
+        self._attempts = {}
+        self._rescheduled = set()
+        self._seq = itertools.count()
+
+        # 已出队尚未处理完毕的任务数
+        self._inflight = 0
+
+        # 优先级函数，返回值越小越先执行；启用后任务源会被完整读入并排序
+        self.priority = priority
+
     def progress(self) -> str:
         """
         任务进度
 
         :return:
         """
-        p = self.max_queue_size - self.worker.qsize()
-        return "__pending__" if p < self.power else f"{p}/{self.max_queue_size}"
+        p = self.taken
+        if p < self.power:
+            return "__pending__"
+        return f"{p}/{'?' if self.max_queue_size is None else self.max_queue_size}"
 
     def launcher(self, *args, **kwargs):
         """
@@ -41,9 +194,401 @@ class CoroutineSpeedup:
 
         :return:
         """
-        while not self.worker.empty():
-            task = self.worker.get_nowait()
+        self._live += 1
+        try:
+            # 功率收缩时，多余的协程在领取新任务前自行退出
+            while self._live <= self.power and not self._expired:
+                task = self.worker.get()
+                # 任务流已枯竭，将终止信号传递给其余协程
+                if task is _SENTINEL:
+                    self._exhausted.set()
+                    self.worker.put(_SENTINEL)
+                    return
+                # 重试任务不重复计入进度
+                if self._attempt_key(task) not in self._attempts:
+                    self.taken += 1
+                self._inflight += 1
+                try:
+                    self.dispatch(task, *args, **kwargs)
+                finally:
+                    self._inflight -= 1
+        finally:
+            self._live -= 1
+
+    def dispatch(self, task: Any, *args, **kwargs):
+        """
+        主机限流
+
+        同一主机的在途任务已达上限时，任务暂存于该主机的积压队列，
+        由持有该主机配额的协程在手头任务结束后接力执行，当前协程则继续领取其他任务。
+        :param task:
+        :return:
+        """
+        key = self.host_key(task) if self.host_limit else None
+        if key is None:
+            return self._drive(task, *args, **kwargs)
+
+        if self._host_inflight.get(key, 0) >= self.host_limit:
+            self._host_parked.setdefault(key, deque()).append(task)
+            return
+
+        self._host_inflight[key] = self._host_inflight.get(key, 0) + 1
+        try:
+            self._drive(task, *args, **kwargs)
+            parked = self._host_parked.get(key)
+            while parked:
+                self._drive(parked.popleft(), *args, **kwargs)
+        finally:
+            self._host_inflight[key] -= 1
+            if not self._host_inflight[key]:
+                del self._host_inflight[key]
+                self._host_parked.pop(key, None)
+
+    def _drive(self, task: Any, *args, **kwargs):
+        # 整体运行时限到期，积压任务不再启动
+        if self._expired:
+            self.skipped += 1
+            return
+
+        timeout = self.task_timeout
+        if self._deadline is not None:
+            remaining = self._deadline - time.time()
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        timer = gevent.Timeout(max(timeout, 0)) if timeout is not None else None
+
+        current, start = gevent.getcurrent(), time.time()
+        if self.checkpoint is not None:
+            self._emitted[current] = []
+        # 任务是否正常了结，异常中断的任务不写入检查点，续传时重新执行
+        settled = False
+        try:
+            if timer:
+                timer.start()
             self.control_driver(task, *args, **kwargs)
+            settled = True
+        except gevent.Timeout as t:
+            if t is not timer:
+                raise
+            self.on_deadline(task)
+            settled = True
+        except Exception as e:  # noqa
+            logger.exception(e)
+        finally:
+            if timer:
+                timer.close()
+            self.metrics.observe(time.time() - start)
+            # 任务已终结，回收重试计数并写入检查点
+            emitted = self._emitted.pop(current, None)
+            if current in self._rescheduled:
+                self._rescheduled.discard(current)
+            else:
+                self._attempts.pop(self._attempt_key(task), None)
+                if settled and self.checkpoint is not None:
+                    self.checkpoint.complete(task, emitted)
+            failed = current in self._failed
+            self._failed.discard(current)
+            if self.controller:
+                self.controller.observe(ok=not failed)
+
+    def on_deadline(self, task: Any):
+        """
+        任务超出时限被强制中断后的收尾逻辑，由子类按需标注
+
+        :param task:
+        :return:
+        """
+        self.record_error(DeadlineExceeded(task))
+
+    def watchdog(self):
+        """
+        整体运行时限
+
+        时限到期后停止投喂并清空待执行队列，在途任务由各自的计时器中断。
+        :return:
+        """
+        gevent.sleep(max(self._deadline - time.time(), 0))
+        self._expired = True
+        self._feeder.kill()
+        while not self.worker.empty():
+            if self.worker.get_nowait() is not _SENTINEL:
+                self.skipped += 1
+        self.skipped += len(self._delayed)
+        self._delayed = []
+        self.worker.put_nowait(_SENTINEL)
+        # 协程可能全部忙于在途任务而经由 _expired 退出，不会读到终止信号，由此处通知功率调节结束
+        self._exhausted.set()
+        logger.warning(f"运行超出时限 - budget={self.budget}s [{self.progress()}]")
+
+    def emit(self, result: Any):
+        """
+        提交一条任务结果
+
+        配置了结果汇时随产随写，否则缓存至 done 队列等待 offload()
+        :param result:
+        :return:
+        """
+        emitted = self._emitted.get(gevent.getcurrent())
+        if emitted is not None:
+            emitted.append(result)
+        if self.sink is None:
+            self.done.put_nowait(result)
+        elif hasattr(self.sink, "write"):
+            self.sink.write(result)
+        else:
+            self.sink(result)
+
+    def retry(self, task: Any) -> bool:
+        """
+        申请重试
+
+        未达到重试上限时，任务进入延迟重试堆，到期后重新投喂，不占用协程等待。
+        :param task:
+        :return: False 表示重试次数已耗尽（或运行已超时），调用方应写入最终结果
+        """
+        key = self._attempt_key(task)
+        failures = self._attempts.get(key, 0) + 1
+        if failures >= self.max_attempts or self._expired:
+            return False
+        self._attempts[key] = failures
+        delay = min(self.backoff_cap, self.backoff * 2 ** (failures - 1)) * random.uniform(0.5, 1.5)
+        heapq.heappush(self._delayed, (time.time() + delay, next(self._seq), task))
+        self._rescheduled.add(gevent.getcurrent())
+        return True
+
+    def retries(self, task: Any) -> int:
+        """
+        任务已重试的次数
+
+        :param task:
+        :return:
+        """
+        return self._attempts.get(self._attempt_key(task), 0)
+
+    @staticmethod
+    def _attempt_key(task: Any) -> Hashable:
+        """
+        重试计数的键：可哈希的任务以自身为键，不可哈希的任务（如 dict）以对象 id 为键
+
+        重试时投回队列的是同一任务对象，在任务了结、计数回收之前 id 保持不变。
+        :param task:
+        :return:
+        """
+        try:
+            hash(task)
+        except TypeError:
+            return "id", id(task)
+        return task
+
+    def _release_due(self) -> float:
+        """
+        将到期的重试任务投回队列
+
+        :return: 距离下一个重试任务到期的秒数
+        """
+        while self._delayed and self._delayed[0][0] <= time.time():
+            self.worker.put(heapq.heappop(self._delayed)[-1])
+        return self._delayed[0][0] - time.time() if self._delayed else 0.1
+
+    def restore(self):
+        """
+        断点续传：读回检查点，重放已有结果，并记下无需再执行的任务
+
+        :return:
+        """
+        self._completed = set()
+        if self.checkpoint is None:
+            return
+        self._completed, results = self.checkpoint.restore()
+        for result in results:
+            self.emit(result)
+        if self._completed:
+            logger.info(f"断点续传 - completed={len(self._completed)} results={len(results)}")
+
+    def record_error(self, error: BaseException):
+        """
+        上报一次网络异常（超时、连接失败等），作为自适应功率的收缩信号
+
+        :param error:
+        :return:
+        """
+        self.metrics.record_error(error)
+        self._failed.add(gevent.getcurrent())
+
+    def regulator(self, *args, **kwargs):
+        """
+        功率调节
+
+        周期性地结束一个观测窗口，按控制器给出的功率扩容或收缩协程。
+        :return:
+        """
+        start = last = time.time()
+        while not self._exhausted.wait(timeout=self.interval) and not self._expired:
+            now = time.time()
+            power = self.controller.update(now - last)
+            last = now
+            if power != self.power:
+                logger.info(
+                    f"自适应功率 - power={self.power}->{power} "
+                    f"throughput={self.controller.throughput:.1f}/s [{self.progress()}]"
+                )
+                self.power = power
+                self.power_history.append((round(now - start, 1), power))
+            # 扩容：补齐协程数
+            for _ in range(self.power - self._live):
+                self._pool.spawn(self.launcher, *args, **kwargs)
+
+    def feeder(self):
+        """
+        任务投喂
+
+        按需从任务源中取出任务，队列满载时阻塞，直到协程消费后再补充。
+        :return:
+        """
+        try:
+            for task in self._source:
+                self._release_due()
+                self.worker.put(task)
+            # 任务源枯竭后，等待在途任务与延迟重试全部了结
+            while self._delayed or self._inflight or not self.worker.empty():
+                gevent.sleep(min(max(self._release_due(), 0.01), 0.1))
+        finally:
+            # 因运行超时被中断时，终止信号由 watchdog 负责投放
+            if not self._expired:
+                self.worker.put(_SENTINEL)
+
+    def shard_of(self, task: Any) -> int:
+        """
+        任务分片：同一主机的任务总是落在同一个工作进程
+
+        :param task:
+        :return:
+        """
+        key = self.host_key(task)
+        key = task if key is None else key
+        return zlib.crc32(str(key).encode("utf8")) % self.workers
+
+    def _shard_worker(self, shard: int, channel, power: int, args, kwargs):
+        """
+        工作进程入口：只处理属于本分片的任务，结果分批回传主进程
+
+        :param shard:
+        :param channel:
+        :param power:
+        :return:
+        """
+        self._is_shard = True
+        self.on_shard(shard)
+        docker, sink = self.docker, self.sink
+        # 按规范化后的任务分片，保证去重在进程间同样生效
+        canon = self.canonicalize or (lambda t: t)
+        self.docker = (task for task in docker if self.shard_of(canon(task)) == shard)
+        if self.total is None and hasattr(docker, "__len__"):
+            self.total = sum(
+                1 for task in map(canon, docker) if self.shard_of(task) == shard and not (self._completed and task in self._completed)
+            )
+        # 主进程重放的历史结果已留在主进程，不再回传
+        self.done = Queue()
+        # 子进程不直接写结果汇与指标文件，统一交由主进程落盘；检查点按分片各自追加
+        self.sink, self.metrics_path = None, None
+        if self.checkpoint is not None:
+            self.checkpoint = self.checkpoint.fork(shard)
+
+        def _ship():
+            batch = []
+            while not self.done.empty():
+                batch.append(self.done.get_nowait())
+            if batch:
+                channel.put(batch)
+
+        def _shipper():
+            while True:
+                gevent.sleep(0.5)
+                _ship()
+
+        shipper = gevent.spawn(_shipper)
+        try:
+            self.go(power, *args, **kwargs)
+        finally:
+            shipper.kill()
+            _ship()
+            # 结束信号携带本分片的运行指标与最终的功率、进度
+            self.metrics.gauges = {
+                "power": self.power, "taken": self.taken, "total": self.max_queue_size, "skipped": self.skipped
+            }
+            channel.put(self.metrics)
+            self.sink = sink
+
+    def on_shard(self, shard: int):
+        """
+        工作进程初始化，子类可在此重置从主进程继承的状态
+
+        :param shard:
+        :return:
+        """
+        pass
+
+    def _go_sharded(self, power: int, *args, **kwargs):
+        """
+        多进程分片执行
+
+        :param power: 全局功率，均摊到各个工作进程
+        :return:
+        """
+        # 检查点由主进程统一读回，子进程继承已完成任务集合
+        self.restore()
+
+        ctx = multiprocessing.get_context("fork")
+        channel = ctx.Queue()
+        power = max(1, math.ceil(power / self.workers))
+        processes = [
+            ctx.Process(target=self._shard_worker, args=(shard, channel, power, args, kwargs), daemon=True)
+            for shard in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+        logger.info(f"分片执行 - workers={self.workers} power={power}/worker")
+
+        # 主进程的功率与进度由各分片回传的值汇总
+        self.metrics = RunMetrics()
+        self.power = self.taken = self.max_queue_size = self.skipped = 0
+        finished = 0
+        try:
+            while finished < self.workers:
+                try:
+                    batch = channel.get(timeout=1)
+                except queue.Empty:
+                    # 工作进程异常退出，未能发送结束信号
+                    if not any(process.is_alive() for process in processes):
+                        break
+                    continue
+                if isinstance(batch, RunMetrics):
+                    self.metrics.merge(batch)
+                    self._merge_gauges(batch.gauges)
+                    finished += 1
+                    continue
+                for result in batch:
+                    self.emit(result)
+            for process in processes:
+                process.join()
+                if process.exitcode:
+                    logger.error(f"工作进程异常退出 - pid={process.pid} exitcode={process.exitcode}")
+        finally:
+            self.killer()
+            self._release()
+            self.report_metrics()
+
+    def _merge_gauges(self, gauges: dict):
+        """
+        汇总分片的功率与进度，任一分片任务总数未知时总数记为未知
+
+        :param gauges:
+        :return:
+        """
+        self.power += gauges.get("power", 0)
+        self.taken += gauges.get("taken", 0)
+        self.skipped += gauges.get("skipped", 0)
+        total = gauges.get("total")
+        self.max_queue_size = None if total is None or self.max_queue_size is None else self.max_queue_size + total
 
     def control_driver(self, task: Any, *args, **kwargs):
         """
@@ -62,16 +607,65 @@ class CoroutineSpeedup:
         """
         pass
 
+    def admit(self, source):
+        """
+        任务准入：规范化并剔除重复任务
+
+        :param source:
+        :return:
+        """
+        seen = SeenFilter(self.dedupe_capacity) if self.dedupe else None
+        for task in source:
+            if self.canonicalize is not None:
+                task = self.canonicalize(task)
+                if task is None or task == "":
+                    continue
+            if seen is not None and seen.check_and_add(task):
+                self.duplicates += 1
+                continue
+            yield task
+
     def overload(self):
         """
         任务重载
 
+        不再一次性灌入队列，仅探测任务源是否为空并统计任务总数。
         :return:
         """
-        if self.docker:
-            for task in self.docker:
-                self.worker.put_nowait(task)
-        self.max_queue_size = self.worker.qsize()
+        self.max_queue_size, self._source = 0, None
+        if self.docker is None:
+            return
+
+        self.duplicates = 0
+        source = iter(self.docker)
+        if self.canonicalize is not None or self.dedupe:
+            source = self.admit(source)
+        if self._completed:
+            source = (task for task in source if task not in self._completed)
+        try:
+            first = next(source)
+        except StopIteration:
+            return
+        self._source = itertools.chain([first], source)
+
+        # 优先级调度：稳定排序，同优先级的任务保持原有次序
+        ranked = None
+        if self.priority is not None:
+            ranked = sorted(self._source, key=self.priority)
+            self._source = iter(ranked)
+
+        if self.total is not None:
+            self.max_queue_size = self.total
+        elif ranked is not None:
+            self.max_queue_size = len(ranked)
+        elif hasattr(self.docker, "__len__"):
+            # 去重模式下为上限估计
+            self.max_queue_size = len(self.docker)
+            if self._completed:
+                canon = self.canonicalize or (lambda t: t)
+                self.max_queue_size -= sum(1 for task in self.docker if canon(task) in self._completed)
+        else:
+            self.max_queue_size = None
 
     def offload(self) -> Optional[List[Any]]:
         """
@@ -98,25 +692,106 @@ class CoroutineSpeedup:
 
         :return:
         """
+        # 多进程分片执行，工作进程内不再二次分片
+        if self.workers > 1 and not self._is_shard:
+            if "fork" in multiprocessing.get_all_start_methods():
+                return self._go_sharded(self.power if power is None else power, *args, **kwargs)
+            logger.warning("当前平台不支持 fork，回退至单进程运行")
+
+        # 断点续传，分片内的已完成任务集合由主进程读回后继承
+        if not self._is_shard:
+            self.restore()
 
         # 任务重载
         self.overload()
 
         # 弹出空载任务
         if self.max_queue_size == 0:
+            self._release()
             return
 
         # 配置弹性采集功率
         # self.power = max(os.cpu_count(), power, self.power)
         self.power = self.power if power is None else power
-        self.power = self.max_queue_size if self.power > self.max_queue_size else self.power
+        if self.max_queue_size and self.power > self.max_queue_size:
+            self.power = self.max_queue_size
+
+        # 有界队列：协程消费多少，投喂多少
+        ceiling = max(self.power, self.max_power) if self.adaptive else self.power
+        self.worker = Queue(maxsize=self.queue_size or ceiling * 2)
+        self.taken = 0
+        self._host_inflight, self._host_parked = {}, {}
+        self._live, self._exhausted = 0, Event()
+        self._deadline, self._expired, self.skipped = None, False, 0
+        self.metrics = RunMetrics()
+        self._delayed, self._attempts, self._rescheduled, self._inflight = [], {}, set(), 0
 
         # 任务启动
-        task_list = []
+        self._pool = Group()
+        self._feeder = self._pool.spawn(self.feeder)
         for _ in range(self.power):
-            task = gevent.spawn(self.launcher, *args, **kwargs)
-            task_list.append(task)
+            self._pool.spawn(self.launcher, *args, **kwargs)
+        if self.adaptive:
+            self.controller = AIMDController(power=self.power, max_power=ceiling)
+            self.power_history = [(0, self.power)]
+            self._pool.spawn(self.regulator, *args, **kwargs)
+        watchdog = None
+        if self.budget:
+            self._deadline = time.time() + self.budget
+            watchdog = gevent.spawn(self.watchdog)
         try:
-            gevent.joinall(task_list)
+            self._pool.join()
         finally:
+            if watchdog:
+                watchdog.kill()
             self.killer()
+            self._release()
+            self.report_metrics()
+
+    def _release(self):
+        """
+        关闭结果汇与检查点，确保缓冲区落盘
+
+        :return:
+        """
+        if hasattr(self.sink, "close"):
+            self.sink.close()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+
+    @property
+    def latency(self):
+        return self.metrics.latency
+
+    def stats(self) -> dict:
+        """
+        运行指标快照：吞吐量、延迟分布、在途任务数、队列深度与按类型统计的错误数
+
+        :return:
+        """
+        return self.metrics.snapshot(
+            power=self.power,
+            in_flight=self._inflight,
+            queue_depth=self.worker.qsize(),
+            delayed=len(self._delayed),
+            skipped=self.skipped,
+            progress=self.progress(),
+        )
+
+    def report_metrics(self):
+        """
+        输出运行指标摘要
+
+        :return:
+        """
+        self.metrics.finished_at = time.time()
+        # 工作进程的指标随结束信号回传，由主进程合并后统一输出
+        if self._is_shard or not self.metrics.completed:
+            return
+        summary = self.stats()
+        logger.info("耗时分布 - " + " ".join(f"{k}={v}" for k, v in summary["latency"].items()))
+        logger.info("运行指标 - " + json.dumps(summary, ensure_ascii=False))
+        if self.metrics_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.metrics_path)), exist_ok=True)
+            with open(self.metrics_path, "w", encoding="utf8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/4 9:07
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 链接规范化与去重
+import hashlib
+import math
+import re
+from typing import Optional, Any
+from urllib.parse import urlsplit, urlunsplit
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Google 搜索结果中的面包屑分隔符，如 `https://a.com › auth › register`
+_BREADCRUMB = re.compile(r"\s*[›»]\s*")
+
+# 面包屑中被省略的层级
+_ELLIPSIS = {"…", "...", ""}
+
+
+def canonicalize_url(url: Any) -> Any:
+    """
+    链接规范化
+
+    - 面包屑还原为路径，剔除省略的层级与首尾空白
+    - 协议与域名小写，去除默认端口
+    - 去除路径末尾的斜杠与 fragment
+    非字符串任务原样返回。
+    :param url:
+    :return:
+    """
+    if not isinstance(url, str):
+        return url
+    head, *crumbs = _BREADCRUMB.split(url.strip())
+    url = "/".join([head.rstrip("/")] + [c.strip("/") for c in crumbs if c.strip() not in _ELLIPSIS])
+    if not url:
+        return url
+    if "://" not in url:
+        url = f"https://{url}"
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    host = f"[{host}]" if ":" in host else host
+    netloc = host if port is None or port == _DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+    path = parts.path.rstrip("/")
+    return urlunsplit((scheme, netloc, path, parts.query, ""))
+
+
+class BloomFilter:
+    """
+    布隆过滤器
+
+    用于超大规模输入的近似去重，以 error_rate 的误判率（将新链接误判为已见）换取固定内存。
+    """
+
+    def __init__(self, capacity: int, error_rate: Optional[float] = 1e-4):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class SeenFilter:
+    """
+    已见集合
+
+    capacity 为空时使用精确集合，否则使用布隆过滤器。
+    """
+
+    def __init__(self, capacity: Optional[int] = None, error_rate: Optional[float] = 1e-4):
+        self._seen = set() if capacity is None else BloomFilter(capacity, error_rate)
+
+    def check_and_add(self, item: Any) -> bool:
+        """
+        :param item:
+        :return: True 表示此前已见
+        """
+        key = item if isinstance(item, str) else repr(item)
+        if key in self._seen:
+            return True
+        self._seen.add(key)
+        return False
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/4 9:07
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 运行指标
+import math
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Optional
+
+
+class LatencyHistogram:
+    """
+    对数分桶的延迟直方图
+
+    桶边界按 growth 等比增长，分位数的相对误差不超过 growth - 1，内存占用与样本数无关。
+    """
+
+    def __init__(self, lowest: Optional[float] = 0.001, highest: Optional[float] = 3600, growth: Optional[float] = 1.1):
+        self.bounds = []
+        bound = lowest
+        while bound < highest:
+            self.bounds.append(bound)
+            bound *= growth
+        self.bounds.append(highest)
+        # 末位桶收纳超出 highest 的样本
+        self.counts = [0] * (len(self.bounds) + 1)
+
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """
+        分位数（取所在桶的上边界，不超过观测到的最大值）
+
+        :param q: within [0, 100]
+        :return:
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * q / 100))
+        cumulative = 0
+        for index, n in enumerate(self.counts):
+            cumulative += n
+            if cumulative >= rank:
+                bound = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": round(self.percentile(50), 3),
+            "p90": round(self.percentile(90), 3),
+            "p99": round(self.percentile(99), 3),
+            "max": round(self.max, 3),
+        }
+
+    def merge(self, other: "LatencyHistogram"):
+        """
+        合并另一个同构直方图（如工作进程回传的分片统计）
+
+        :param other:
+        :return:
+        """
+        for index, n in enumerate(other.counts):
+            self.counts[index] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+
+class RunMetrics:
+    """
+    单次运行的吞吐与延迟指标
+
+    由引擎在任务边界更新，运行期间可随时通过 snapshot() 读取。
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+        # 单任务耗时分布
+        self.latency = LatencyHistogram()
+
+        # 已完成的任务数（含重试产生的执行次数）
+        self.completed = 0
+
+        # 按异常类型统计的错误数
+        self.errors = Counter()
+
+        # 按站点统计的下载字节数，以及提前结束读取的响应数
+        self.bytes = Counter()
+        self.aborted = 0
+
+        # 按事件名统计的站点事件数，分片运行时由工作进程写入并回传主进程
+        self.events = Counter()
+
+        # 工作进程结束时的功率与进度，由主进程汇总
+        self.gauges = {}
+
+    def observe(self, seconds: float):
+        self.completed += 1
+        self.latency.observe(seconds)
+
+    def record_error(self, error: BaseException):
+        self.errors[type(error).__name__] += 1
+
+    def record_bytes(self, host: str, n: int, aborted: bool = False):
+        self.bytes[host] += n
+        self.aborted += int(bool(aborted))
+
+    def merge(self, other: "RunMetrics"):
+        self.started_at = min(self.started_at, other.started_at)
+        if other.finished_at:
+            self.finished_at = max(self.finished_at or 0, other.finished_at)
+        self.completed += other.completed
+        self.errors.update(other.errors)
+        self.bytes.update(other.bytes)
+        self.aborted += other.aborted
+        self.events.update(other.events)
+        self.latency.merge(other.latency)
+
+    def snapshot(self, **gauges) -> dict:
+        """
+        指标快照
+
+        :param gauges: 由引擎提供的瞬时值，如在途任务数、队列深度
+        :return:
+        """
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "elapsed": round(elapsed, 3),
+            "completed": self.completed,
+            "tasks_per_second": round(self.completed / elapsed, 3) if elapsed > 0 else 0.0,
+            **gauges,
+            "errors": dict(self.errors),
+            "bytes": {
+                "total": sum(self.bytes.values()),
+                "hosts": len(self.bytes),
+                "aborted": self.aborted,
+                "top": dict(self.bytes.most_common(10)),
+            },
+            "latency": self.latency.summary(),
+        }
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/4 9:07
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 流式结果落盘
+import csv
+import json
+import os
+import time
+from typing import Optional, List, Any, Iterator
+
+
+class ResultSink:
+    """
+    结果汇
+
+    协程每产出一条结果即调用 write()，结果在内存中攒够一批（或距上次落盘超过 flush_interval 秒）后追加写入文件。
+    子类只需实现 _dump() 与 load()。
+    """
+
+    def __init__(self, path: str, batch_size: Optional[int] = 200, flush_interval: Optional[float] = None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: List[Any] = []
+        self._file = None
+        self._flushed_at = time.time()
+
+        # 已写入的结果数
+        self.count = 0
+
+    def __call__(self, result: Any):
+        self.write(result)
+
+    def open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf8", newline="")
+        return self
+
+    def write(self, result: Any):
+        self._buffer.append(result)
+        self.count += 1
+        if len(self._buffer) >= self.batch_size or (
+                self.flush_interval is not None and time.time() - self._flushed_at >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        self._flushed_at = time.time()
+        if not self._buffer:
+            return
+        self.open()
+        self._dump(self._buffer)
+        self._file.flush()
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _dump(self, results: List[Any]):
+        raise NotImplementedError
+
+    def load(self) -> Iterator[Any]:
+        raise NotImplementedError
+
+
+def _pack(obj: Any):
+    # 结果对象可通过 pack() 提供紧凑的可序列化形式
+    pack = getattr(obj, "pack", None)
+    if pack is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return pack()
+
+
+class JsonlSink(ResultSink):
+    """每行一个 JSON 对象，非基础类型的结果须实现 pack()"""
+
+    def _dump(self, results: List[Any]):
+        self._file.write("".join(json.dumps(r, ensure_ascii=False, default=_pack) + "\n" for r in results))
+
+    def load(self) -> Iterator[Any]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf8") as f:
+            for line in f:
+                # 进程中断时末行可能残缺
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+class CsvSink(ResultSink):
+    """以 fieldnames 为表头的 CSV，仅适用于字典结果"""
+
+    def __init__(self, path: str, fieldnames: List[str], batch_size: Optional[int] = 200):
+        super(CsvSink, self).__init__(path=path, batch_size=batch_size)
+        self.fieldnames = fieldnames
+
+    def open(self):
+        if self._file is None:
+            is_new = not os.path.exists(self.path) or not os.path.getsize(self.path)
+            super(CsvSink, self).open()
+            if is_new:
+                csv.writer(self._file).writerow(self.fieldnames)
+        return self
+
+    def _dump(self, results: List[Any]):
+        writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction="ignore")
+        writer.writerows(results)
+
+    def load(self) -> Iterator[Any]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf8", newline="") as f:
+            yield from csv.DictReader(f)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/7 10:12
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 请求超时策略
+from typing import Optional, Tuple
+
+from .metrics import LatencyHistogram
+
+
+class TimeoutPolicy:
+    """
+    连接/读取分离的请求超时
+
+    固定模式下始终返回 (connect, read)。自适应模式下依据本次运行中成功请求的响应延迟
+    （至响应头到达）的 percentile 分位数乘以 factor 推导超时，并限定在 [floor, 配置值] 之间：
+    失联站点很快被放弃，慢而存活的站点仍有充足的时间完成。样本不足 min_samples 时使用配置值。
+    """
+
+    def __init__(
+            self,
+            connect: Optional[float] = 10,
+            read: Optional[float] = 60,
+            adaptive: Optional[bool] = False,
+            percentile: Optional[float] = 99,
+            factor: Optional[float] = 3,
+            connect_floor: Optional[float] = 3,
+            read_floor: Optional[float] = 10,
+            min_samples: Optional[int] = 50,
+            refresh: Optional[int] = 20,
+    ):
+        """
+
+        :param connect: 连接超时（秒），自适应模式下为上限
+        :param read: 读取超时（秒），自适应模式下为上限
+        :param adaptive: 是否依据运行中的延迟分布自适应
+        :param percentile: 参考的延迟分位数，within [0, 100]
+        :param factor: 分位数的放大系数
+        :param connect_floor: 自适应连接超时的下限
+        :param read_floor: 自适应读取超时的下限
+        :param min_samples: 开始自适应所需的最少样本数
+        :param refresh: 每新增若干样本重新计算一次
+        """
+        self.connect = connect
+        self.read = read
+        self.adaptive = adaptive
+        self.percentile = percentile
+        self.factor = factor
+        self.connect_floor = min(connect_floor, connect)
+        self.read_floor = min(read_floor, read)
+        self.min_samples = min_samples
+        self.refresh = max(1, refresh)
+
+        self.latency = LatencyHistogram()
+        self._timeout = (connect, read)
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """requests 的 timeout 参数 (connect, read)"""
+        return self._timeout
+
+    def observe(self, seconds: float):
+        """
+        记录一次成功请求的响应延迟
+
+        :param seconds:
+        :return:
+        """
+        if not self.adaptive:
+            return
+        self.latency.observe(seconds)
+        if self.latency.count >= self.min_samples and self.latency.count % self.refresh == 0:
+            reference = self.latency.percentile(self.percentile) * self.factor
+            self._timeout = (
+                round(min(max(reference, self.connect_floor), self.connect), 3),
+                round(min(max(reference, self.read_floor), self.read), 3),
+            )
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/5 10:41
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 流式读取响应体
+from typing import Optional, Sequence, Tuple
+
+from requests import Response
+
+
+def read_body(
+        response: Response,
+        max_bytes: Optional[int] = None,
+        markers: Optional[Sequence[str]] = None,
+        grace: Optional[int] = 0,
+        chunk_size: Optional[int] = 16 * 1024,
+) -> Tuple[int, bool]:
+    """
+    流式读取以 stream=True 发起的请求的响应体，读取结果回填至 response.content
+
+    达到字节上限，或全部标记（不区分大小写）均已出现并额外读取 grace 字节后即停止读取并关闭连接，
+    剩余内容不再下载。
+
+    :param response: 以 stream=True 获取的响应
+    :param max_bytes: 响应体字节上限，缺省不限制
+    :param markers: 决定性标记，全部出现后提前结束读取
+    :param grace: 标记全部出现后继续读取的字节数，用于覆盖紧随其后的脚本等内容
+    :param chunk_size:
+    :return: (线路上传输的字节数, 是否提前结束)
+    """
+    pending = [m.lower().encode("utf8") for m in markers or []]
+    lookback = max((len(m) for m in pending), default=0)
+
+    buffer = bytearray()
+    stop_at = max_bytes
+    aborted = False
+    try:
+        for chunk in response.iter_content(chunk_size):
+            # 标记可能跨块出现，回看标记长度
+            offset = max(0, len(buffer) - lookback)
+            buffer += chunk
+            if pending:
+                window = bytes(buffer[offset:]).lower()
+                pending = [m for m in pending if m not in window]
+                if not pending:
+                    limit = len(buffer) + (grace or 0)
+                    stop_at = limit if stop_at is None else min(stop_at, limit)
+            if stop_at is not None and len(buffer) >= stop_at:
+                del buffer[stop_at:]
+                aborted = True
+                break
+    finally:
+        # 未读完的连接无法复用，直接关闭
+        if aborted:
+            response.close()
+
+    response._content = bytes(buffer)
+    response._content_consumed = True
+
+    # 线路字节数（压缩前），不可用时以解码后的长度代替
+    raw = getattr(response, "raw", None)
+    try:
+        wire = int(raw.tell())
+    except (AttributeError, TypeError, ValueError):
+        wire = len(buffer)
+    return wire or len(buffer), aborted
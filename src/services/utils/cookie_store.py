@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/4 12:13
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: Cloudflare 通行凭证缓存
+import json
+import os
+import time
+from typing import Optional, Dict
+
+# Cloudflare 下发的通行凭证及相关 cookie
+_CLEARANCE_PREFIXES = ("cf_", "__cf")
+
+
+class ClearanceCookieStore:
+    """
+    Cloudflare 通行凭证缓存
+
+    按 netloc 缓存 cf_clearance 等 cookie 及其过期时间，并记录凭证绑定的 User-Agent，
+    落盘后可在后续请求与后续运行中复用，跳过 JS 质询。
+    {netloc: {"user_agent": str, "cookies": [{"name", "value", "domain", "path", "expires"}, ...]}}
+    """
+
+    def __init__(self, path: Optional[str] = None, session_ttl: Optional[float] = 3600, autosave: Optional[int] = 50):
+        self.path = path
+        # 未声明过期时间的会话 cookie 的保留时长
+        self.session_ttl = session_ttl
+        # 累积若干次更新后自动落盘
+        self.autosave = autosave
+
+        self._entries: Dict[str, dict] = {}
+        self._dirty = 0
+        self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        for netloc, entry in entries.items():
+            self._merge(netloc, entry)
+
+    def _merge(self, netloc: str, entry: dict):
+        # 以凭证过期时间更晚者为准
+        current = self._entries.get(netloc)
+        if current is None or self._expiry(entry) > self._expiry(current):
+            self._entries[netloc] = entry
+
+    @staticmethod
+    def _expiry(entry: dict) -> float:
+        return max((c["expires"] for c in entry.get("cookies", [])), default=0)
+
+    def get(self, netloc: str) -> Optional[dict]:
+        """
+        读取未过期的凭证
+
+        :param netloc:
+        :return:
+        """
+        entry = self._entries.get(netloc)
+        if entry is None:
+            return None
+        now = time.time()
+        cookies = [c for c in entry["cookies"] if c["expires"] > now]
+        if not cookies:
+            del self._entries[netloc]
+            self._dirty += 1
+            return None
+        entry["cookies"] = cookies
+        return entry
+
+    def apply(self, session, netloc: str) -> Optional[str]:
+        """
+        将缓存的凭证注入会话
+
+        :param session: requests.Session / cloudscraper
+        :param netloc:
+        :return: 凭证绑定的 User-Agent，请求时须携带该 UA，否则凭证无效
+        """
+        entry = self.get(netloc)
+        if entry is None:
+            return None
+        for c in entry["cookies"]:
+            session.cookies.set(c["name"], c["value"], domain=c["domain"], path=c["path"], expires=int(c["expires"]))
+        return entry.get("user_agent")
+
+    def harvest(self, session, netloc: str, user_agent: str):
+        """
+        从会话中收集该主机的 Cloudflare 凭证
+
+        :param session:
+        :param netloc:
+        :param user_agent: 本次请求使用的 User-Agent
+        :return:
+        """
+        host = netloc.split(":")[0]
+        now = time.time()
+        cookies = [
+            {
+                "name": c.name,
+                "value": c.value,
+                "domain": c.domain,
+                "path": c.path,
+                "expires": c.expires if c.expires else now + self.session_ttl,
+            }
+            for c in session.cookies
+            if c.name.startswith(_CLEARANCE_PREFIXES) and host.endswith(c.domain.lstrip("."))
+        ]
+        if not cookies:
+            return
+        entry = {"user_agent": user_agent, "cookies": cookies}
+        if entry == self._entries.get(netloc):
+            return
+        self._entries[netloc] = entry
+        self._dirty += 1
+        if self.autosave and self._dirty >= self.autosave:
+            self.save()
+
+    def save(self):
+        """
+        落盘：先与磁盘上的版本合并（其他工作进程可能已写入），再原子替换
+
+        :return:
+        """
+        if not self.path or not self._dirty:
+            return
+        self.load()
+        now = time.time()
+        entries = {
+            netloc: entry for netloc, entry in self._entries.items()
+            if self._expiry(entry) > now
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        path_tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(path_tmp, "w", encoding="utf8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(path_tmp, self.path)
+        self._dirty = 0
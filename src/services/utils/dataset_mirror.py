@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/8 10:26
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 远程数据集镜像
+import json
+import os
+from typing import Optional, Dict, Iterable, Iterator, List, Tuple, Union
+
+import requests
+from gevent.pool import Pool
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from .http_cache import HttpCache
+
+
+class DatasetMirror:
+    """
+    远程数据集的本地镜像
+
+    并发拉取远程数据集文件并落盘至 dir_mirror，同时记录 ETag / Last-Modified；
+    已下载的文件以条件请求复检，收到 304 即沿用本地副本，远程不可达时同样回落至本地副本。
+    """
+
+    def __init__(
+            self,
+            dir_mirror: str,
+            url_template: str,
+            timeout: Optional[Union[float, Tuple[float, float]]] = (5, 30),
+            power: Optional[int] = 16,
+    ):
+        """
+
+        :param dir_mirror: 镜像目录
+        :param url_template: 远程文件链接模版，以文件名填充，如 https://example.com/database/{}
+        :param timeout: 连接/读取超时（秒）
+        :param power: 下载并发数
+        """
+        self.dir_mirror = dir_mirror
+        self.url_template = url_template
+        self.timeout = timeout
+        self.power = power
+
+        self.downloaded = 0
+        self.revalidated = 0
+
+        self.path_meta = os.path.join(dir_mirror, "mirror.json")
+        self._meta: Dict[str, dict] = {}
+        self.load()
+
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=power))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=power))
+
+    def load(self):
+        if not os.path.exists(self.path_meta):
+            return
+        try:
+            with open(self.path_meta, "r", encoding="utf8") as f:
+                self._meta.update(json.load(f))
+        except (OSError, ValueError):
+            return
+
+    def save(self):
+        os.makedirs(self.dir_mirror, exist_ok=True)
+        path_tmp = f"{self.path_meta}.tmp"
+        with open(path_tmp, "w", encoding="utf8") as f:
+            json.dump(self._meta, f)
+        os.replace(path_tmp, self.path_meta)
+
+    def path_of(self, name: str) -> str:
+        return os.path.join(self.dir_mirror, name)
+
+    def fetch(self, name: str) -> Optional[str]:
+        """
+        同步单个数据集文件
+
+        :param name: 文件名，如 dataset_2022-02-07.txt
+        :return: 本地副本路径；远程不存在且无本地副本时返回 None
+        """
+        path = self.path_of(name)
+        local = path if os.path.exists(path) else None
+        headers = HttpCache.validators(self._meta.get(name)) if local else {}
+        url = self.url_template.format(name)
+        try:
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304:
+                    self.revalidated += 1
+                    return local
+                if response.status_code != 200:
+                    return local
+                # 写入临时文件，下载中断时不破坏已有副本
+                os.makedirs(self.dir_mirror, exist_ok=True)
+                path_tmp = f"{path}.tmp"
+                with open(path_tmp, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+                os.replace(path_tmp, path)
+                self._meta[name] = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+                self.downloaded += 1
+                return path
+        except (requests.RequestException, OSError) as e:
+            logger.warning(f"数据集同步失败 - url={url} error={e.__class__.__name__}")
+            return local
+
+    def fetch_all(self, names: Iterable[str]) -> List[str]:
+        """
+        并发同步数据集文件
+
+        :param names:
+        :return: 可用的本地副本路径，保持输入顺序
+        """
+        names = list(names)
+        paths = Pool(self.power).map(self.fetch, names) if names else []
+        self.save()
+        logger.info(f"数据集同步 - files={len(names)} downloaded={self.downloaded} "
+                    f"revalidated={self.revalidated} missing={paths.count(None)}")
+        return [path for path in paths if path]
+
+    @staticmethod
+    def iter_lines(paths: Iterable[str]) -> Iterator[str]:
+        """
+        逐行读取数据集文件，跳过空行
+
+        :param paths:
+        :return:
+        """
+        for path in paths:
+            with open(path, "r", encoding="utf8", errors="ignore") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield line
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/6 15:37
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 域名预解析
+import json
+import os
+import socket
+import time
+from typing import Optional, Dict, Iterable, List, Set, Tuple
+
+from gevent.pool import Pool
+from loguru import logger
+
+# 域名不存在
+_NXDOMAIN = {socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)}
+
+
+class DnsCache:
+    """
+    进程内 DNS 缓存
+
+    以独立的高并发批量解析全部域名：解析成功的地址缓存在进程内，install() 后 socket.getaddrinfo
+    优先使用缓存，HTTP 阶段不再重复解析；NXDOMAIN 的域名写入负缓存并落盘，ttl 内不再重复解析。
+    """
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            ttl: Optional[float] = 3600,
+            negative_ttl: Optional[float] = 3 * 24 * 3600,
+            power: Optional[int] = 256,
+    ):
+        """
+
+        :param path: 负缓存落盘路径
+        :param ttl: 解析结果在进程内的有效期（秒）
+        :param negative_ttl: NXDOMAIN 负缓存的有效期（秒）
+        :param power: 解析并发数
+        """
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.power = power
+
+        self._positive: Dict[str, Tuple[float, List[tuple]]] = {}
+        self._negative: Dict[str, float] = {}
+        self._getaddrinfo = None
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf8") as f:
+                self._negative.update(json.load(f))
+        except (OSError, ValueError):
+            return
+
+    def save(self):
+        if not self.path:
+            return
+        now = time.time()
+        negative = {host: expires for host, expires in self._negative.items() if expires > now}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        path_tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(path_tmp, "w", encoding="utf8") as f:
+            json.dump(negative, f)
+        os.replace(path_tmp, self.path)
+
+    def is_negative(self, host: str) -> bool:
+        expires = self._negative.get(host)
+        return expires is not None and expires > time.time()
+
+    def resolve(self, host: str) -> Optional[bool]:
+        """
+        解析单个域名
+
+        :param host:
+        :return: True 解析成功；False 域名不存在；None 暂时无法确定（超时、服务器故障等）
+        """
+        if self.is_negative(host):
+            return False
+        cached = self._positive.get(host)
+        if cached is not None and cached[0] > time.time():
+            return True
+        getaddrinfo = self._getaddrinfo or socket.getaddrinfo
+        try:
+            addresses = getaddrinfo(host, 443, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            if e.errno in _NXDOMAIN:
+                return False
+            return None
+        except (OSError, UnicodeError):
+            return None
+        self._positive[host] = (time.time() + self.ttl, addresses)
+        return True
+
+    def resolve_all(self, hosts: Iterable[str]) -> Set[str]:
+        """
+        并发解析，返回不存在的域名
+
+        全部域名均解析失败时视为本机解析不可用，不写入负缓存，也不剔除任何域名。
+        :param hosts:
+        :return:
+        """
+        hosts = list(set(hosts))
+        if not hosts:
+            return set()
+        pending = [host for host in hosts if not self.is_negative(host)]
+        results = dict(zip(pending, Pool(self.power).map(self.resolve, pending)))
+        nxdomain = {host for host, ok in results.items() if ok is False}
+
+        if len(pending) >= 10 and not any(results.values()):
+            logger.warning(f"域名预解析失败，本机 DNS 可能不可用 - hosts={len(pending)}")
+            return set()
+
+        expires = time.time() + self.negative_ttl
+        for host in nxdomain:
+            self._negative[host] = expires
+        return nxdomain | (set(hosts) - set(pending))
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """
+        socket.getaddrinfo 的缓存版本，仅对 TCP 解析生效，未命中时回落至原始实现
+        """
+        original = self._getaddrinfo or socket.getaddrinfo
+        cached = self._positive.get(host) if isinstance(host, str) else None
+        if cached is None or cached[0] <= time.time() or type not in (0, socket.SOCK_STREAM):
+            return original(host, port, family, type, proto, flags)
+        if port is None:
+            port = 0
+        elif isinstance(port, str):
+            port = int(port) if port.isdigit() else socket.getservbyname(port)
+        addresses = []
+        for family_, type_, proto_, canonname, sockaddr in cached[1]:
+            if family and family_ != family:
+                continue
+            addresses.append((family_, type_, proto_, canonname, (sockaddr[0], port, *sockaddr[2:])))
+        return addresses or original(host, port, family, type, proto, flags)
+
+    def install(self):
+        """接管 socket.getaddrinfo"""
+        if self._getaddrinfo is None:
+            self._getaddrinfo = socket.getaddrinfo
+            socket.getaddrinfo = self.getaddrinfo
+
+    def uninstall(self):
+        if self._getaddrinfo is not None:
+            socket.getaddrinfo = self._getaddrinfo
+            self._getaddrinfo = None
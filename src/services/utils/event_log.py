@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/7 15:26
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 站点事件日志
+import random
+import time
+from collections import Counter
+from typing import Optional, Callable
+
+from loguru import logger
+
+
+class EventLog:
+    """
+    站点事件日志
+
+    热路径上的逐条站点事件以结构化字段（event / url / label 等）绑定到日志记录，
+    消息文本惰性格式化，只有级别达到 level 且通过 sample 抽样的事件才会输出；
+    所有事件均计入计数器，每隔 interval 秒输出一行汇总。
+    """
+
+    def __init__(
+            self,
+            level: Optional[str] = "DEBUG",
+            sample: Optional[float] = 1.0,
+            interval: Optional[float] = 30,
+            progress: Optional[Callable[[], str]] = None,
+    ):
+        """
+
+        :param level: 逐条事件的最低输出级别
+        :param sample: 达到级别的事件的输出比例，within [0, 1]
+        :param interval: 汇总行的输出间隔（秒），None 表示不输出
+        :param progress: 返回任务进度的函数
+        """
+        self.level = level
+        self.level_no = logger.level(level).no
+        self._levels = {}
+        self.sample = sample
+        self.interval = interval
+        self.progress = progress or (lambda: "")
+
+        self.counter = Counter()
+        self._window = Counter()
+        self._window_start = time.time()
+
+    def reset(self):
+        """清空计数，如分片子进程继承了主进程的计数"""
+        self.counter = Counter()
+        self._window = Counter()
+        self._window_start = time.time()
+
+    def log(self, level: str, event: str, **fields):
+        """
+        记录一条站点事件
+
+        :param level: 日志级别
+        :param event: 事件名，如“实例正常”“拒绝注册”
+        :param fields: 结构化字段，如 url、label
+        :return:
+        """
+        self.counter[event] += 1
+        self._window[event] += 1
+
+        level_no = self._levels.get(level)
+        if level_no is None:
+            level_no = self._levels[level] = logger.level(level).no
+        if level_no >= self.level_no and (self.sample >= 1 or random.random() < self.sample):
+            logger.bind(event=event, **fields).opt(lazy=True).log(
+                level, "{} - [{}] {}",
+                lambda: event, self.progress,
+                lambda: " ".join(f"{k}={v}" for k, v in fields.items())
+            )
+
+        if self.interval is not None and time.time() - self._window_start >= self.interval:
+            self.summary()
+
+    def summary(self, final: Optional[bool] = False):
+        """
+        输出汇总行：窗口内各事件的计数与速率
+
+        :param final: 运行结束时输出累计计数
+        :return:
+        """
+        now = time.time()
+        elapsed = max(now - self._window_start, 1e-6)
+        window, self._window, self._window_start = self._window, Counter(), now
+        if final:
+            if self.counter:
+                logger.info("事件汇总 - [{}] {}", self.progress(), self._format(self.counter))
+            return
+        if window:
+            logger.info("事件汇总 - [{}] rate={}/s {}", self.progress(),
+                        round(sum(window.values()) / elapsed, 2), self._format(window))
+
+    @staticmethod
+    def _format(counter: Counter) -> str:
+        return " ".join(f"{event}={n}" for event, n in counter.most_common())
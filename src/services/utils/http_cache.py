@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/5 14:02
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 条件请求缓存
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any
+
+
+class HttpCache:
+    """
+    响应缓存
+
+    以 URL 为键存储 ETag / Last-Modified 以及分类器从页面中提取的事实摘要（而非页面本身），
+    复检时携带 If-None-Match / If-Modified-Since，收到 304 即沿用摘要重新分类。
+    ttl 不为空时，存储时间在 ttl 以内的条目被视为新鲜，直接使用而不发出请求。
+    条目数超过 capacity 时按最近访问时间淘汰。
+    """
+
+    def __init__(
+            self,
+            path: str,
+            capacity: Optional[int] = 100000,
+            ttl: Optional[float] = None,
+            evict_every: Optional[int] = 500,
+    ):
+        """
+
+        :param path: SQLite 数据库文件路径
+        :param capacity: 条目数上限
+        :param ttl: 信任缓存的时长（秒），缺省时总是发起条件请求
+        :param evict_every: 每写入若干次检查一次容量
+        """
+        self.path = path
+        self.capacity = capacity
+        self.ttl = ttl
+        self.evict_every = evict_every
+
+        self.hits = 0
+        self.revalidated = 0
+
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._writes = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # 连接不能跨 fork 复用，分片子进程各自重新连接
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, facts TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed_at ON responses (accessed_at)")
+            self._pid = os.getpid()
+        return self._conn
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存条目并刷新访问时间
+
+        :param url:
+        :return: {"etag", "last_modified", "facts", "stored_at"}
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, facts, stored_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        return {"etag": row[0], "last_modified": row[1], "facts": json.loads(row[2]), "stored_at": row[3]}
+
+    def fresh(self, entry: Optional[dict]) -> bool:
+        """条目是否可免请求直接使用"""
+        return bool(entry) and self.ttl is not None and time.time() - entry["stored_at"] < self.ttl
+
+    @staticmethod
+    def validators(entry: Optional[dict]) -> Dict[str, str]:
+        """
+        条件请求头
+
+        :param entry:
+        :return:
+        """
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url: str, facts: dict, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """
+        写入缓存条目
+
+        既无校验器又未开启 ttl 的条目无从复用，不写入。
+
+        :param url:
+        :param facts: 页面事实摘要
+        :param etag:
+        :param last_modified:
+        :return:
+        """
+        if not (etag or last_modified) and self.ttl is None:
+            return
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, json.dumps(facts, ensure_ascii=False, separators=(",", ":")), now, now)
+            )
+            self._writes += 1
+            if self.capacity and self._writes % self.evict_every == 0:
+                self._evict()
+
+    def touch(self, url: str):
+        """304 响应后刷新存储时间"""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+
+    def _evict(self):
+        overflow = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.capacity
+        if overflow > 0:
+            self.conn.execute(
+                "DELETE FROM responses WHERE url IN "
+                "(SELECT url FROM responses ORDER BY accessed_at ASC LIMIT ?)", (overflow,)
+            )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                if self.capacity:
+                    self._evict()
+                self._conn.close()
+            self._conn = None
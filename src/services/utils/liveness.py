@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/6 20:05
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: 端口存活探测
+import socket
+import ssl
+from typing import Optional, Iterable, Set, Tuple
+
+from gevent.pool import Pool
+from loguru import logger
+
+Address = Tuple[str, int]
+
+
+class LivenessProbe:
+    """
+    端口存活探测
+
+    以极高并发与较短超时对 (host, port) 发起 TCP 连接（可选完成 TLS 握手），
+    仅可达的站点进入完整的 HTTP 检测，避免失联站点占用协程直至请求超时。
+    """
+
+    def __init__(self, timeout: Optional[float] = 5, power: Optional[int] = 512, tls: Optional[bool] = False):
+        """
+
+        :param timeout: 连接与握手的超时（秒）
+        :param power: 探测并发数
+        :param tls: 是否完成 TLS 握手
+        """
+        self.timeout = timeout
+        self.power = power
+        self.tls = tls
+
+        self._context = ssl.create_default_context()
+        self._context.check_hostname = False
+        self._context.verify_mode = ssl.CERT_NONE
+
+    def probe(self, address: Address) -> bool:
+        """
+        探测单个地址
+
+        TLS 协议层面的错误说明端口存活，交由 HTTP 阶段判定，不视为不可达。
+        :param address: (host, port)
+        :return: 是否可达
+        """
+        host, port = address
+        try:
+            with socket.create_connection((host, port), timeout=self.timeout) as sock:
+                if self.tls:
+                    sock.settimeout(self.timeout)
+                    with self._context.wrap_socket(sock, server_hostname=host):
+                        pass
+        except ssl.SSLError as e:
+            # gevent 以 SSLError 报告握手超时
+            return "timed out" not in str(e)
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def probe_all(self, addresses: Iterable[Address]) -> Set[Address]:
+        """
+        并发探测，返回不可达的地址
+
+        全部地址均不可达时视为本机网络异常，不剔除任何地址。
+        :param addresses:
+        :return:
+        """
+        addresses = list(set(addresses))
+        if not addresses:
+            return set()
+        results = dict(zip(addresses, Pool(self.power).map(self.probe, addresses)))
+        unreachable = {address for address, ok in results.items() if not ok}
+        if len(addresses) >= 10 and len(unreachable) == len(addresses):
+            logger.warning(f"存活探测全部失败，本机网络可能异常 - hosts={len(addresses)}")
+            return set()
+        return unreachable
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# Time       : 2022/2/4 12:13
+# Author     : QIN2DIM
+# Github     : https://github.com/QIN2DIM
+# Description: cloudscraper 会话池
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Optional, Callable, Hashable, Any
+
+from cloudscraper import create_scraper
+from gevent.event import Event
+
+
+class ScraperPool:
+    """
+    有界的 cloudscraper 会话池
+
+    会话按需创建，数量不超过 size，协程按任务借出、用完归还。
+    归还时记录会话最近服务的主机，同一主机的后续请求优先借用该会话，
+    从而复用其 keep-alive 连接与已完成的 TLS 握手。
+    """
+
+    def __init__(
+            self,
+            size: Optional[int] = 32,
+            factory: Optional[Callable[[], Any]] = None,
+            pool_connections: Optional[int] = 64,
+            pool_maxsize: Optional[int] = 4,
+            affinity_size: Optional[int] = 4096,
+    ):
+        self.size = size
+        self.factory = create_scraper if factory is None else factory
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.affinity_size = affinity_size
+
+        # 空闲会话 id -> session
+        self._idle = OrderedDict()
+        # 主机 -> 最近服务该主机的会话
+        self._affinity = OrderedDict()
+        # 等待空闲会话的协程
+        self._waiters = deque()
+        # 全部会话
+        self._sessions = []
+
+    @property
+    def created(self) -> int:
+        return len(self._sessions)
+
+    def _create(self):
+        session = self.factory()
+        # 放大连接池：每个会话为更多主机保留 keep-alive 连接
+        for adapter in getattr(session, "adapters", {}).values():
+            if hasattr(adapter, "init_poolmanager"):
+                adapter._pool_connections = self.pool_connections
+                adapter._pool_maxsize = self.pool_maxsize
+                adapter.init_poolmanager(self.pool_connections, self.pool_maxsize, block=False)
+        self._sessions.append(session)
+        return session
+
+    def acquire(self, key: Optional[Hashable] = None):
+        """
+        借出会话
+
+        :param key: 主机键，用于优先借出最近服务过该主机的会话
+        :return:
+        """
+        while True:
+            session = self._affinity.get(key) if key is not None else None
+            if session is not None and id(session) in self._idle:
+                return self._idle.pop(id(session))
+            if self._idle:
+                return self._idle.popitem(last=False)[-1]
+            if self.size is None or self.created < self.size:
+                return self._create()
+            waiter = Event()
+            self._waiters.append(waiter)
+            woken = False
+            try:
+                waiter.wait()
+                woken = True
+            finally:
+                # 等待中被中断（如任务超时）：尚未被唤醒则移出等待队列，已被唤醒则将唤醒转交下一位
+                if not woken:
+                    if waiter.is_set():
+                        self._wake()
+                    else:
+                        self._waiters.remove(waiter)
+
+    def release(self, session, key: Optional[Hashable] = None):
+        """
+        归还会话
+
+        :param session:
+        :param key:
+        :return:
+        """
+        self._idle[id(session)] = session
+        if key is not None:
+            self._affinity[key] = session
+            self._affinity.move_to_end(key)
+            while len(self._affinity) > self.affinity_size:
+                self._affinity.popitem(last=False)
+        self._wake()
+
+    def _wake(self):
+        if self._waiters:
+            self._waiters.popleft().set()
+
+    @contextmanager
+    def session(self, key: Optional[Hashable] = None):
+        session = self.acquire(key)
+        try:
+            yield session
+        finally:
+            self.release(session, key)
+
+    def close(self):
+        for session in self._sessions:
+            try:
+                session.close()
+            except Exception:  # noqa
+                pass
+        self._sessions, self._idle, self._affinity = [], OrderedDict(), OrderedDict()
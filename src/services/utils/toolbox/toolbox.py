@@ -3,6 +3,7 @@
 # Author     : QIN2DIM
 # Github     : https://github.com/QIN2DIM
 # Description:
+import atexit
 import sys
 import os
 import subprocess
@@ -14,10 +15,121 @@ from selenium.webdriver import ChromeOptions
 from webdriver_manager.chrome import ChromeDriverManager
 
 
+class QueuedSink:
+    """
+    非阻塞的日志 sink
+
+    日志记录进入队列后立即返回，由原生线程批量写出，写入终端或文件的 I/O 不再阻塞协程调度。
+    loguru 自带的 enqueue 依赖 multiprocessing 管道，在 gevent 猴子补丁下会阻塞事件循环，故不使用。
+    进程 fork 后自动在子进程中重建写线程。
+    """
+
+    def __init__(
+            self,
+            target,
+            rotation: Optional[int] = None,
+            retention: Optional[float] = None,
+            encoding: Optional[str] = "utf8",
+            batch: Optional[int] = 512,
+    ):
+        """
+
+        :param target: 文本流（如 sys.stdout）或日志文件路径
+        :param rotation: 日志文件的大小上限（字节），超出后轮转
+        :param retention: 轮转文件的保留时长（秒）
+        :param encoding:
+        :param batch: 单次写出的最大条数
+        """
+        self.target = target
+        self.rotation = rotation
+        self.retention = retention
+        self.encoding = encoding
+        self.batch = batch
+
+        self._queue = None
+        self._pid = None
+        self._stopped = None
+        self._file = None
+
+    def write(self, message: str):
+        if self._pid != os.getpid():
+            self._start()
+        self._queue.put(message)
+
+    def _start(self):
+        from gevent.monkey import get_original
+
+        self._queue = get_original("queue", "SimpleQueue")()
+        self._stopped = get_original("threading", "Lock")()
+        self._stopped.acquire()
+        self._pid = os.getpid()
+        self._file = None
+        get_original("_thread", "start_new_thread")(self._run, (self._queue, self._stopped))
+        atexit.register(self.stop)
+
+    def _run(self, queue, stopped):
+        while True:
+            messages = [queue.get()]
+            while len(messages) < self.batch and not queue.empty():
+                messages.append(queue.get())
+            closing = None in messages
+            self._dump("".join(m for m in messages if m is not None))
+            if closing:
+                if self._file is not None:
+                    self._file.close()
+                stopped.release()
+                return
+
+    def _dump(self, text: str):
+        if not text:
+            return
+        if not isinstance(self.target, str):
+            self.target.write(text)
+            self.target.flush()
+            return
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.target)), exist_ok=True)
+            self._file = open(self.target, "a", encoding=self.encoding)
+        self._file.write(text)
+        self._file.flush()
+        if self.rotation and self._file.tell() >= self.rotation:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        stem, ext = os.path.splitext(self.target)
+        rotated, n = f"{stem}.{time.strftime('%Y-%m-%d_%H-%M-%S')}{ext}", 1
+        while os.path.exists(rotated):
+            rotated, n = f"{stem}.{time.strftime('%Y-%m-%d_%H-%M-%S')}.{n}{ext}", n + 1
+        os.replace(self.target, rotated)
+        if self.retention:
+            dir_, prefix = os.path.split(stem)
+            for name in os.listdir(dir_ or "."):
+                path = os.path.join(dir_, name)
+                if name.startswith(f"{prefix}.") and path != self.target \
+                        and time.time() - os.path.getmtime(path) > self.retention:
+                    os.remove(path)
+
+    def stop(self):
+        """写出队列中的剩余日志并结束写线程"""
+        if self._pid != os.getpid() or self._queue is None:
+            return
+        queue, self._queue, self._pid = self._queue, None, None
+        queue.put(None)
+        self._stopped.acquire(timeout=5)
+
+
 class InitLog:
 
     @staticmethod
-    def init_log(**sink_path):
+    def init_log(queued: Optional[bool] = True, **sink_path):
+        """
+
+        :param queued: 终端与文件 sink 是否经由非阻塞队列写出
+        :param sink_path: error / runtime 日志文件路径
+        :return:
+        """
         event_logger_format = (
             "<g>{time:YYYY-MM-DD HH:mm:ss}</g> | "
             "<lvl>{level}</lvl> - "
@@ -26,29 +138,43 @@ class InitLog:
         )
         logger.remove()
         logger.add(
-            sink=sys.stdout,
+            sink=QueuedSink(sys.stdout) if queued else sys.stdout,
             colorize=True,
             level="DEBUG",
             format=event_logger_format,
             diagnose=False
         )
         if sink_path.get("error"):
-            logger.add(
-                sink=sink_path.get("error"),
-                level="ERROR",
-                rotation="1 week",
-                encoding="utf8",
-                diagnose=False
-            )
+            if queued:
+                logger.add(
+                    sink=QueuedSink(sink_path.get("error"), rotation=20 * 1024 ** 2, retention=4 * 7 * 24 * 3600),
+                    level="ERROR",
+                    diagnose=False
+                )
+            else:
+                logger.add(
+                    sink=sink_path.get("error"),
+                    level="ERROR",
+                    rotation="1 week",
+                    encoding="utf8",
+                    diagnose=False
+                )
         if sink_path.get("runtime"):
-            logger.add(
-                sink=sink_path.get("runtime"),
-                level="DEBUG",
-                rotation="20 MB",
-                retention="20 days",
-                encoding="utf8",
-                diagnose=False
-            )
+            if queued:
+                logger.add(
+                    sink=QueuedSink(sink_path.get("runtime"), rotation=20 * 1024 ** 2, retention=20 * 24 * 3600),
+                    level="DEBUG",
+                    diagnose=False
+                )
+            else:
+                logger.add(
+                    sink=sink_path.get("runtime"),
+                    level="DEBUG",
+                    rotation="20 MB",
+                    retention="20 days",
+                    encoding="utf8",
+                    diagnose=False
+                )
         return logger
 
 